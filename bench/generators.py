@@ -0,0 +1,84 @@
+import random
+import zipfile
+
+COMMAND_NAMES = ["LOAD_CONST", "LOAD_MEM", "STORE_MEM", "BITWISE_OR", "ADD", "XOR"]
+
+
+def letters_name(number):
+    """Записывает число буквами A-Z: в именах языка нет цифр (0 -> A, 26 -> AA)."""
+    result = ""
+    while True:
+        number, digit = divmod(number, 26)
+        result = chr(ord("A") + digit) + result
+        if number == 0:
+            return result
+        number -= 1
+
+
+def make_vfs_zip(path, files, depth, fanout=8, seed=0):
+    """Создаёт zip-образ VFS с files файлами на глубине до depth каталогов.
+
+    Возвращает путь к самому глубокому каталогу (для замеров cd/ls).
+    """
+    rng = random.Random(seed)
+    deepest = ""
+    deepest_level = 0
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_STORED) as zf:
+        for i in range(files):
+            level = rng.randint(0, depth)
+            parts = [f"dir{rng.randrange(fanout)}" for _ in range(level)]
+            directory = "/".join(parts)
+            if level > deepest_level:
+                deepest, deepest_level = directory, level
+            name = f"{directory}/file{i}.txt" if directory else f"file{i}.txt"
+            zf.writestr(name, f"content {i}\n")
+    return "/" + deepest
+
+
+def make_config(definitions, nesting=2, seed=0):
+    """Текст конфигурации dz3 с вложенными table(...), массивами, ссылками и !( )."""
+    rng = random.Random(seed)
+    numbers = []  # Имена определений с числовыми значениями
+
+    def value(level):
+        kind = rng.randrange(6 if level < nesting else 4)
+        if kind == 0:
+            return str(rng.randrange(100000))
+        if kind == 1:
+            return f'@"text {rng.randrange(1000)}"'
+        if kind == 2 and numbers:
+            a, b = rng.choice(numbers), rng.choice(numbers)
+            return f"!({a} {b} + {rng.randrange(1, 10)} *)"
+        if kind == 3 and numbers:
+            return rng.choice(numbers)
+        if kind == 4:
+            items = ", ".join(value(level + 1) for _ in range(rng.randint(1, 4)))
+            return "{" + items + "}"
+        fields = ",\n".join(f"  F_{letters_name(i)} = {value(level + 1)}" for i in range(rng.randint(1, 4)))
+        return f"table([\n{fields}\n])"
+
+    lines = []
+    for i in range(definitions):
+        name = f"DEF_{letters_name(i)}"
+        if i % 3 == 0:
+            lines.append(f"{name} := {rng.randrange(1000)}")
+            numbers.append(name)
+        else:
+            lines.append(f"(* definition {i} *)")
+            lines.append(f"{name} := {value(0)}")
+    return "\n".join(lines) + "\n"
+
+
+def make_program(instructions, memory_size=1024, seed=0):
+    """Исходный текст программы dz4 из instructions случайных команд."""
+    rng = random.Random(seed)
+    lines = []
+    for _ in range(instructions):
+        command = rng.choice(COMMAND_NAMES)
+        b = rng.randrange(memory_size)
+        c = rng.randrange(1 << 16) if command == "LOAD_CONST" else rng.randrange(memory_size)
+        if command in ("STORE_MEM", "BITWISE_OR"):
+            lines.append(f"{command} 0 {b} {c} {rng.randrange(memory_size)}")
+        else:
+            lines.append(f"{command} 0 {b} {c}")
+    return "\n".join(lines) + "\n"
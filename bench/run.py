@@ -0,0 +1,149 @@
+"""Набор замеров производительности для dz1, dz3 и dz4.
+
+Запуск: python bench/run.py [--preset small|medium|large] [--output results.json]
+[--baseline baseline.json] [--threshold 0.2] [--save-baseline baseline.json]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import contextlib
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for directory in ("dz1", "dz3", "dz4"):
+    sys.path.insert(0, os.path.join(ROOT, directory))
+
+import generators  # noqa: E402
+from shell_emulator import ShellEmulator  # noqa: E402
+from translator import ConfigParser  # noqa: E402
+from assembler_inteprator import assemble, interpret  # noqa: E402
+import engine  # noqa: E402
+
+PRESETS = {
+    "small": {"vfs_files": [1000, 10000], "config_definitions": [100, 1000], "program_instructions": [100, 1000]},
+    "medium": {"vfs_files": [10000, 100000], "config_definitions": [1000, 10000], "program_instructions": [1000, 10000]},
+    "large": {"vfs_files": [100000, 500000], "config_definitions": [10000, 100000],
+              "program_instructions": [10000, 100000]},
+}
+VFS_DEPTH = 6
+REPEAT = 3
+
+
+def _best(func, repeat=REPEAT):
+    """Лучшее время из repeat запусков; вывод функции подавляется."""
+    best = float("inf")
+    for _ in range(repeat):
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            start = time.perf_counter()
+            func()
+            best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_shell(tmp, sizes):
+    results = {}
+    for files in sizes:
+        zip_path = os.path.join(tmp, f"vfs_{files}.zip")
+        deepest = generators.make_vfs_zip(zip_path, files, VFS_DEPTH)
+        config_path = os.path.join(tmp, f"config_{files}.toml")
+        with open(config_path, "w") as f:
+            f.write(f'username = "bench"\nvfs_path = {json.dumps(zip_path)}\n')
+        emulator = ShellEmulator(config_path)
+        results[f"shell.open_index/{files}"] = _best(lambda: emulator.vfs, 1)
+        results[f"shell.ls_root/{files}"] = _best(lambda: emulator.ls("/"))
+        results[f"shell.ls_deep/{files}"] = _best(lambda: emulator.ls(deepest))
+        results[f"shell.cd/{files}"] = _best(lambda: (emulator.cd(deepest), emulator.cd("/")))
+    return results
+
+
+def bench_translator(tmp, sizes):
+    results = {}
+    for definitions in sizes:
+        text = generators.make_config(definitions)
+        results[f"translator.parse/{definitions}"] = _best(lambda: ConfigParser(text).parse())
+    return results
+
+
+def bench_dz4(tmp, sizes):
+    results = {}
+    for instructions in sizes:
+        source = os.path.join(tmp, f"program_{instructions}.txt")
+        binary = os.path.join(tmp, f"program_{instructions}.bin")
+        log = os.path.join(tmp, f"program_{instructions}_log.json")
+        result = os.path.join(tmp, f"result_{instructions}.json")
+        with open(source, "w") as f:
+            f.write(generators.make_program(instructions))
+        results[f"dz4.assemble/{instructions}"] = _best(lambda: assemble(source, binary, log))
+        results[f"dz4.interpret/{instructions}"] = _best(
+            lambda: interpret(binary, memory_range=(0, 50), result_path=result), 1)
+        results[f"dz4.engine/{instructions}"] = _best(lambda: engine.run(binary, result))
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Список замеров, ставших медленнее базовых более чем на threshold."""
+    regressions = []
+    for name, seconds in results.items():
+        base = baseline.get(name)
+        if base and seconds > base * (1 + threshold):
+            regressions.append({"benchmark": name, "baseline": base, "current": seconds,
+                                "ratio": seconds / base})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Замеры производительности dz1, dz3 и dz4.")
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="small", help="Набор размеров входных данных.")
+    parser.add_argument("--only", choices=["shell", "translator", "dz4"], action="append",
+                        help="Запустить только указанные группы замеров.")
+    parser.add_argument("--output", help="Куда сохранить результаты в JSON.")
+    parser.add_argument("--baseline", help="Файл с базовыми результатами для поиска регрессий.")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Допустимое замедление (0.2 = 20%%).")
+    parser.add_argument("--save-baseline", help="Сохранить текущие результаты как базовые.")
+    args = parser.parse_args()
+
+    preset = PRESETS[args.preset]
+    groups = args.only or ["shell", "translator", "dz4"]
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        if "shell" in groups:
+            results.update(bench_shell(tmp, preset["vfs_files"]))
+        if "translator" in groups:
+            results.update(bench_translator(tmp, preset["config_definitions"]))
+        if "dz4" in groups:
+            results.update(bench_dz4(tmp, preset["program_instructions"]))
+
+    report = {
+        "preset": args.preset,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+    for name, seconds in results.items():
+        print(f"{name:40s} {seconds * 1000:12.3f} ms")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=4)
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(report, f, indent=4)
+
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        report["regressions"] = regressions
+        for item in regressions:
+            print(f"REGRESSION {item['benchmark']}: {item['baseline'] * 1000:.3f} ms -> "
+                  f"{item['current'] * 1000:.3f} ms (x{item['ratio']:.2f})", file=sys.stderr)
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(report, f, indent=4)
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
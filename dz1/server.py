@@ -0,0 +1,159 @@
+import sys
+import asyncio
+import argparse
+import itertools
+from collections import deque
+
+from shell_emulator import ShellEmulator, add_snapshot_argument, snapshot_file
+
+
+class SessionMetrics:
+    """Статистика задержек выполнения команд одной сессии."""
+
+    def __init__(self, session_id, peer, window=1024):
+        self.session_id = session_id
+        self.peer = peer
+        self.commands = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._recent = deque(maxlen=window)  # Последние задержки для перцентилей
+
+    def record(self, result):
+        self.commands += 1
+        if result.status != 0:
+            self.errors += 1
+        self.total += result.elapsed
+        self.max = max(self.max, result.elapsed)
+        self._recent.append(result.elapsed)
+
+    def percentile(self, q):
+        if not self._recent:
+            return 0.0
+        ordered = sorted(self._recent)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def summary(self):
+        return {
+            'session': self.session_id,
+            'peer': self.peer,
+            'commands': self.commands,
+            'errors': self.errors,
+            'mean_ms': self.total / self.commands * 1000 if self.commands else 0.0,
+            'p50_ms': self.percentile(0.5) * 1000,
+            'p95_ms': self.percentile(0.95) * 1000,
+            'max_ms': self.max * 1000,
+        }
+
+
+class ShellServer:
+    """Асинхронный сервер: каждое соединение — отдельная сессия эмулятора.
+
+    Все сессии разделяют один индекс VFS и кэш содержимого; изменения файлов
+    у каждой сессии свои, а запись в архив (commit) с сервера запрещена.
+    Команды выполняются в цикле событий без потоков, поэтому общее состояние
+    VFS не требует блокировок. Чтобы одна команда (find или tree по большому
+    образу) не держала цикл и память, её вывод ограничен output_limit
+    символов, а в сокет он пишется кусками по OUTPUT_CHUNK с ожиданием drain.
+    """
+    OUTPUT_LIMIT = 1024 * 1024
+    OUTPUT_CHUNK = 64 * 1024
+
+    def __init__(self, emulator, history=256, output_limit=OUTPUT_LIMIT):
+        self.emulator = emulator
+        self.output_limit = output_limit
+        self.active = {}
+        self.finished = deque(maxlen=history)
+        self._ids = itertools.count(1)
+
+    async def handle(self, reader, writer):
+        session = self.emulator.spawn_session(allow_commit=False)
+        peer = writer.get_extra_info('peername')
+        metrics = SessionMetrics(next(self._ids), str(peer) if peer else 'unix')
+        self.active[metrics.session_id] = metrics
+        try:
+            while True:
+                writer.write(f"{session.username}@{session.current_dir}$ ".encode('utf-8'))
+                await writer.drain()
+                line = await reader.readline()
+                if not line:
+                    break
+                command = line.decode('utf-8', errors='replace').strip()
+                if not command:
+                    continue
+                result, stop = session.execute_captured(command, self.output_limit)
+                metrics.record(result)
+                for start in range(0, len(result.stdout), self.OUTPUT_CHUNK):
+                    writer.write(result.stdout[start:start + self.OUTPUT_CHUNK].encode('utf-8'))
+                    await writer.drain()
+                if stop:
+                    break
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            del self.active[metrics.session_id]
+            self.finished.append(metrics)
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    def metrics(self):
+        """Сводка по активным и последним завершённым сессиям."""
+        return {
+            'active': [m.summary() for m in self.active.values()],
+            'finished': [m.summary() for m in self.finished],
+            'cache': self.emulator.base_vfs.cache.stats(),
+        }
+
+    async def log_metrics(self, interval, file=None):
+        """Раз в interval секунд печатает сводку по сессиям и кэшу (по умолчанию в stderr)."""
+        file = file or sys.stderr
+        while True:
+            await asyncio.sleep(interval)
+            report = self.metrics()
+            print(f"sessions: {len(report['active'])} active, {len(report['finished'])} finished; "
+                  f"cache: {report['cache']}", file=file)
+            for summary in report['active']:
+                print(summary, file=file)
+
+    async def serve(self, host='127.0.0.1', port=8022, unix_path=None, metrics_interval=None):
+        if unix_path:
+            server = await asyncio.start_unix_server(self.handle, path=unix_path)
+        else:
+            server = await asyncio.start_server(self.handle, host, port)
+        reporter = asyncio.create_task(self.log_metrics(metrics_interval)) if metrics_interval else None
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            if reporter is not None:
+                reporter.cancel()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Многопользовательский сервер эмулятора оболочки.')
+    parser.add_argument('--config', default='config.toml', help='Путь к конфигурационному файлу.')
+    parser.add_argument('--host', default='127.0.0.1', help='Адрес для TCP-подключений.')
+    parser.add_argument('--port', type=int, default=8022, help='Порт для TCP-подключений.')
+    parser.add_argument('--unix', help='Путь к Unix-сокету вместо TCP.')
+    parser.add_argument('--metrics-interval', type=float,
+                        help='Печатать сводку по сессиям в stderr раз в указанное число секунд.')
+    parser.add_argument('--output-limit', type=int, default=ShellServer.OUTPUT_LIMIT,
+                        help='Максимальный вывод одной команды в символах.')
+    add_snapshot_argument(parser)
+    args = parser.parse_args()
+
+    server = ShellServer(ShellEmulator(args.config, snapshot_path=snapshot_file(args)),
+                         output_limit=args.output_limit)
+    try:
+        asyncio.run(server.serve(args.host, args.port, args.unix, args.metrics_interval))
+    except KeyboardInterrupt:
+        for summary in server.metrics()['finished']:
+            print(summary, file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,45 +1,254 @@
 import os
-import zipfile
-import toml
-import datetime
-import unittest
+import sys
+import time
+import shlex
+import fnmatch
+import posixpath
+from collections import namedtuple
+
+import snapshot
+from vfs import OverlayFS, VirtualFS
+
+# toml, datetime и argparse импортируются при первом использовании: процессы
+# эмулятора короткоживущие, и время до первого приглашения важнее.
+
+# Результат выполнения одной команды в пакетном режиме
+CommandResult = namedtuple('CommandResult', ['command', 'stdout', 'status', 'elapsed'])
+
+# Описание зарегистрированной команды оболочки
+Command = namedtuple('Command', ['name', 'handler', 'min_args', 'max_args', 'pure'])
+
+
+def command(pure=False):
+    """Помечает метод как команду оболочки.
+
+    pure=True означает, что результат зависит только от аргументов, текущего
+    каталога и содержимого VFS, и его можно запоминать в пределах сессии.
+    """
+    def decorator(func):
+        func.command_pure = pure
+        return func
+    return decorator
+
+
+def build_command_table(cls):
+    """Собирает таблицу команд класса по методам, помеченным @command."""
+    table = {}
+    for name, func in vars(cls).items():
+        if not hasattr(func, 'command_pure'):
+            continue
+        max_args = func.__code__.co_argcount - 1  # Без self
+        min_args = max_args - len(func.__defaults__ or ())
+        table[name] = Command(name, func, min_args, max_args, func.command_pure)
+    return table
+
+
+class _MemoTee:
+    """Пишет вывод насквозь и копит его копию, пока она не превысит лимит."""
+
+    def __init__(self, target, limit):
+        self.target = target
+        self.limit = limit
+        self.size = 0
+        self.parts = []
+
+    def write(self, text):
+        self.target.write(text)
+        if self.parts is not None:
+            self.size += len(text)
+            if self.size > self.limit:
+                self.parts = None
+            else:
+                self.parts.append(text)
+        return len(text)
+
+    def flush(self):
+        self.target.flush()
+
+
+class OutputLimitExceeded(Exception):
+    """Вывод команды превысил лимит; команда прерывается."""
+
+
+class _CommandOutput:
+    """Буфер вывода одной команды с необязательным лимитом в символах.
+
+    При превышении лимита сохраняется только помещающаяся часть, а запись
+    прерывает команду исключением OutputLimitExceeded; дальнейший вывод
+    (например, сообщение об ошибке) отбрасывается.
+    """
+
+    def __init__(self, limit=None):
+        self.limit = limit
+        self.size = 0
+        self.parts = []
+        self.truncated = False
+
+    def write(self, text):
+        if self.truncated:
+            return len(text)
+        if self.limit is not None and self.size + len(text) > self.limit:
+            self.parts.append(text[:self.limit - self.size])
+            self.size = self.limit
+            self.truncated = True
+            raise OutputLimitExceeded(f"output exceeds {self.limit} characters")
+        self.parts.append(text)
+        self.size += len(text)
+        return len(text)
+
+    def flush(self):
+        pass
+
+    def getvalue(self):
+        return ''.join(self.parts)
+
 
 class ShellEmulator:
-    def __init__(self, config_file):
-        with open(config_file, 'r') as f:
-            self.config = toml.load(f)
-            self.username = self.config.get('username')
-            self.vfs_path = self.config.get('vfs_path')
-            self.current_dir = '/'
-            self.command_history = []
+    COMMANDS = {}  # Заполняется после определения класса
+    MEMO_LIMIT = 64 * 1024  # Максимальный размер запоминаемого вывода
+
+
+    def __init__(self, config_file, snapshot_path=None):
+        """Загружает конфигурацию config_file.
+
+        snapshot_path — файл снимка конфигурации и индекса VFS; без него снимок
+        не читается и не пишется.
+        """
+        config = snapshot.load(snapshot_path, config_file) if snapshot_path else None
+        if config is None:
+            import toml
+            with open(config_file, 'r') as f:
+                config = toml.load(f)
+            if snapshot_path:
+                snapshot.save(snapshot_path, config_file, config)
+        self._init_state(config)
+        # Пара (файл снимка, файл конфигурации) до первого открытия VFS
+        self._snapshot = (snapshot_path, config_file) if snapshot_path else None
+
+    def _init_state(self, config, vfs=None, allow_commit=True):
+        self.config = config
+        self.username = self.config.get('username')
+        self.vfs_path = self.config.get('vfs_path')
+        self.current_dir = '/'
+        self.command_history = []
+        self.allow_commit = allow_commit  # Можно ли записывать изменения в архив
+        self._vfs = vfs    # Общий индекс архива только для чтения
+        self._fs = None    # Оверлей этой сессии поверх общего индекса
+        self._memo = {}
+        self._memo_revision = None
+        self._snapshot = None
+        self._out = None   # Поток вывода команд; None — sys.stdout
+
+    def spawn_session(self, allow_commit=True):
+        """Создаёт новую сессию с собственным состоянием и оверлеем.
+
+        Конфигурация и индекс архива общие; изменения файлов сессии другим
+        сессиям не видны.
+        """
+        session = object.__new__(type(self))
+        session._init_state(self.config, self.base_vfs, allow_commit)
+        return session
+
+    @property
+    def vfs(self):
+        """Файловая система сессии: свой оверлей поверх общего индекса."""
+        if self._fs is None:
+            self._fs = OverlayFS(self.base_vfs)
+        return self._fs
+
+    @property
+    def base_vfs(self):
+        """Индекс виртуальной файловой системы, открывается при первом обращении."""
+        if self._vfs is None:
+            index = snapshot.load_index(*self._snapshot) if self._snapshot else None
+            self._vfs = VirtualFS(self.vfs_path, index=index)
+            if self._snapshot and (index is None or tuple(index[0]) != self._vfs.index_key):
+                snapshot.save(*self._snapshot, self.config, self._vfs.index())
+            self._snapshot = None
+        return self._vfs
+
+    @property
+    def out(self):
+        """Поток, в который пишут команды: буфер execute_captured или sys.stdout."""
+        return self._out if self._out is not None else sys.stdout
 
     def _get_file_content(self, path):
         """Возвращает содержимое файла из виртуальной файловой системы."""
-        with zipfile.ZipFile(self.vfs_path, 'r') as zf:
-            with zf.open(path.lstrip('/')) as f:
-                return f.read().decode('utf-8')
+        return str(self.vfs.content(path), 'utf-8')
 
     def _get_dir_content(self, path):
-        """Возвращает список файлов и подкаталогов в виртуальном каталоге."""
-        with zipfile.ZipFile(self.vfs_path, 'r') as zf:
-            return [f.filename for f in zf.infolist() if f.filename.startswith(path.lstrip('/'))]
+        """Возвращает ленивое содержимое виртуального каталога или None."""
+        return self.vfs.list_dir(path)
 
     def _get_full_path(self, path):
         """Возвращает полный путь к файлу/каталогу относительно корня VFS."""
         return os.path.join(self.current_dir, path)
 
+    def _get_node(self, path):
+        full_path = self._get_full_path(path)
+        node = self.vfs.lookup(full_path)
+        if node is None:
+            raise FileNotFoundError(f"No such file or directory: {full_path}")
+        return full_path, node
+
+    @command(pure=True)
     def ls(self, path=''):
         """Выводит список файлов и подкаталогов в текущем каталоге."""
         full_path = self._get_full_path(path)
+        node = self.vfs.lookup(full_path)
+        if node is not None and not node.is_dir:
+            print(node.name, file=self.out)
+            return [node.name]
         dir_content = self._get_dir_content(full_path)
         if dir_content:
             for file in dir_content:
-                print(file)
+                print(file, file=self.out)
             return dir_content
         else:
-            print("No files found in the directory.")
+            print("No files found in the directory.", file=self.out)
             return "No files found in the directory."
 
+    @command(pure=True)
+    def find(self, path='', name=None):
+        """Выводит пути всех файлов и каталогов поддерева, опционально по маске имени."""
+        _, node = self._get_node(path)
+        count = 0
+        for entry in self.vfs.walk(node):
+            if (entry is node and node.is_dir) or (name is not None and not fnmatch.fnmatchcase(entry.name, name)):
+                continue
+            print('/' + entry.path, file=self.out)
+            count += 1
+        return count
+
+    @command(pure=True)
+    def du(self, path=''):
+        """Выводит размеры подкаталогов и общий размер каталога в байтах."""
+        full_path, node = self._get_node(path)
+        if node.is_dir:
+            for child in node.children.values():
+                if child.is_dir:
+                    print(f"{child.size}\t{posixpath.join(full_path, child.name)}", file=self.out)
+        print(f"{node.size}\t{full_path}", file=self.out)
+        return node.size
+
+    @command(pure=True)
+    def tree(self, path=''):
+        """Выводит поддерево каталога в виде дерева."""
+        full_path, node = self._get_node(path)
+        branches = []  # Признаки «последний среди соседей» у предков текущего узла
+        count = 0
+        for depth, entry, is_last in self.vfs.walk_tree(node):
+            if depth == 0:
+                print(full_path, file=self.out)
+                continue
+            del branches[depth - 1:]
+            indent = ''.join('    ' if last else '│   ' for last in branches)
+            print(f"{indent}{'└── ' if is_last else '├── '}{entry.display_name}", file=self.out)
+            branches.append(is_last)
+            count += 1
+        return count
+
+    @command()
     def cd(self, path):
         """Переходит в указанный каталог."""
         full_path = self._get_full_path(path)
@@ -48,91 +257,199 @@ class ShellEmulator:
         else:
             self.current_dir = os.path.join(self.current_dir, path)
 
+    @command()
     def exit(self):
         """Выход из эмулятора."""
-        print("Exiting shell emulator.")
+        print("Exiting shell emulator.", file=self.out)
         exit()
 
+    @command()
     def date(self):
         """Выводит текущую дату и время."""
+        import datetime
         now = datetime.datetime.now()
-        print(now.strftime("%Y-%m-%d %H:%M:%S"))
+        print(now.strftime("%Y-%m-%d %H:%M:%S"), file=self.out)
         return now.strftime("%Y-%m-%d %H:%M:%S")
 
+    @command()
     def chown(self, path, user):
         """Изменяет владельца файла."""
-        print(f"chown: {user} {path}")
+        full_path, _ = self._get_node(path)
+        self.vfs.chown(full_path, user)
+        print(f"chown: {user} {path}", file=self.out)
         return f"chown: {user} {path}"
 
+    @command()
+    def touch(self, path):
+        """Создаёт пустой файл, если его нет."""
+        self.vfs.touch(self._get_full_path(path))
+
+    @command()
+    def rm(self, path):
+        """Удаляет файл или каталог вместе с содержимым."""
+        full_path, _ = self._get_node(path)
+        self.vfs.remove(full_path)
+
+    @command()
+    def commit(self):
+        """Записывает накопленные изменения в архив VFS одним проходом."""
+        if not self.allow_commit:
+            raise PermissionError("commit is not allowed in this session")
+        count = self.vfs.commit()
+        print(f"Committed {count} changes.", file=self.out)
+        return count
+
+    @command()
     def history(self):
         """Выводит историю выполненных команд."""
         if self.command_history:
             for i, command in enumerate(self.command_history):
-                print(f"{i+1}: {command}")
+                print(f"{i+1}: {command}", file=self.out)
             return self.command_history 
         else:
-            print("No commands in history.")
+            print("No commands in history.", file=self.out)
             return "No commands in history."
 
+    def execute(self, command):
+        """Выполняет одну команду и возвращает код завершения (0 — успех)."""
+        self.command_history.append(command)
+        try:
+            args = shlex.split(command)
+            if not args:
+                return 0
+            command_name, args = args[0], args[1:]
+            spec = self.COMMANDS.get(command_name)
+            if spec is None:
+                print(f"Unknown command: {command_name}", file=self.out)
+                return 127
+            if not spec.min_args <= len(args) <= spec.max_args:
+                expected = (str(spec.max_args) if spec.min_args == spec.max_args
+                            else f"{spec.min_args}-{spec.max_args}")
+                print(f"{command_name}: expected {expected} arguments, got {len(args)}", file=self.out)
+                return 2
+            if spec.pure:
+                self._call_memoized(spec, args)
+            else:
+                spec.handler(self, *args)
+            return 0
+        except Exception as e:
+            print(f"Error: {e}", file=self.out)
+            return 1
+
+    def _call_memoized(self, spec, args):
+        """Вызывает чистую команду, повторяя сохранённый вывод при совпадении ключа.
+
+        Вывод идёт насквозь по мере выполнения; запоминается он, только если
+        не превысил MEMO_LIMIT символов.
+        """
+        revision = self.vfs.revision()
+        if revision != self._memo_revision:
+            self._memo.clear()
+            self._memo_revision = revision
+        key = (spec.name, tuple(args), self.current_dir)
+        cached = self._memo.get(key)
+        if cached is not None:
+            self.out.write(cached[0])
+            return cached[1]
+        tee = _MemoTee(self.out, self.MEMO_LIMIT)
+        previous, self._out = self._out, tee
+        try:
+            value = spec.handler(self, *args)
+        finally:
+            self._out = previous
+        if tee.parts is not None:
+            self._memo[key] = (''.join(tee.parts), value)
+        return value
+
     def run(self):
         """Запускает эмулятор."""
         while True:
             command = input(f"{self.username}@{self.current_dir}$ ")
-            self.command_history.append(command)
-            try:
-                args = command.split()
-                command_name = args[0]
-                if hasattr(self, command_name):
-                    getattr(self, command_name)(*args[1:])
-                else:
-                    print(f"Unknown command: {command_name}")
-            except Exception as e:
-                print(f"Error: {e}")
-
-# Тесты
-class TestShellEmulator(unittest.TestCase):
-
-    def setUp(self):
-        self.emulator = ShellEmulator('config.toml')
-
-    def test_ls_empty(self):
-        self.emulator.cd('/empty_dir')
-        self.emulator.ls()
-        self.assertEqual(self.emulator.ls(), "No files found in the directory.")
-
-    def test_ls_files(self):
-        self.emulator.ls('/test_dir')
-        self.assertIn("test_dir/file1.txt", self.emulator.ls())
-        self.assertIn("test_dir/file2.txt", self.emulator.ls())
-
-    def test_cd_root(self):
-        self.emulator.cd('/')
-        self.assertEqual(self.emulator.current_dir, '/')
-
-    def test_cd_subdir(self):
-        self.emulator.cd('test_dir')
-        self.assertEqual(self.emulator.current_dir, '/test_dir')
-
-    def test_date(self):
-        self.emulator.date()
-        self.assertIsInstance(self.emulator.date(), str)
-
-    def test_chown(self):
-        self.emulator.chown('test_dir/file1.txt', 'user1')
-        self.assertEqual(self.emulator.chown('test_dir/file1.txt', 'user1'), "chown: user1 test_dir/file1.txt")
-
-    def test_history_empty(self):
-        self.assertEqual(self.emulator.history(), "No commands in history.")
-
-    def test_history_filled(self):
-        self.emulator.run()
-        self.emulator.ls()
-        self.emulator.cd('test_dir')
-        history = self.emulator.history()
-        self.assertIn("ls", history)
-        self.assertIn("cd test_dir", history)
+            self.execute(command)
+
+    def execute_captured(self, command, limit=None):
+        """Выполняет команду с перехватом вывода.
+
+        Возвращает пару (CommandResult, stop), где stop означает, что была
+        выполнена команда exit. limit ограничивает вывод числом символов:
+        команда, превысившая его, прерывается с кодом 1, а к обрезанному
+        выводу добавляется предупреждение.
+        """
+        buffer = _CommandOutput(limit)
+        start = time.perf_counter()
+        stop = False
+        previous, self._out = self._out, buffer
+        try:
+            status = self.execute(command)
+        except SystemExit:
+            status = 0
+            stop = True
+        finally:
+            self._out = previous
+        if buffer.truncated:
+            buffer.parts.append(f"\nOutput truncated at {limit} characters.\n")
+        result = CommandResult(command, buffer.getvalue(), status, time.perf_counter() - start)
+        return result, stop
+
+    def run_script(self, lines):
+        """Выполняет команды из итерируемого источника строк без приглашения.
+
+        Вывод каждой команды перехватывается в буфер; возвращается список
+        CommandResult. Команда exit завершает сценарий, но не процесс.
+        """
+        results = []
+        for line in lines:
+            command = line.strip()
+            if not command or command.startswith('#'):
+                continue
+            result, stop = self.execute_captured(command)
+            results.append(result)
+            if stop:
+                break
+        return results
+
+
+ShellEmulator.COMMANDS = build_command_table(ShellEmulator)
+
+
+def add_snapshot_argument(parser):
+    parser.add_argument('--snapshot', nargs='?', const='', metavar='PATH',
+                        help='Ускорять запуск снимком конфигурации и индекса VFS '
+                             '(по умолчанию <config>.snapshot).')
+
+
+def snapshot_file(args):
+    """Путь снимка из аргументов --config и --snapshot или None."""
+    if args.snapshot is None:
+        return None
+    return args.snapshot or snapshot.snapshot_path(args.config)
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description='Эмулятор командной оболочки над zip-образом.')
+    parser.add_argument('--config', default='config.toml', help='Путь к конфигурационному файлу.')
+    parser.add_argument('--script', help="Файл со списком команд ('-' — стандартный ввод).")
+    add_snapshot_argument(parser)
+    args = parser.parse_args()
+
+    emulator = ShellEmulator(args.config, snapshot_path=snapshot_file(args))
+    if args.script is None:
+        emulator.run()
+        return
+
+    if args.script == '-':
+        results = emulator.run_script(sys.stdin)
+    else:
+        with open(args.script, 'r', encoding='utf-8') as f:
+            results = emulator.run_script(f)
+    sys.stdout.write(''.join(r.stdout for r in results))
+    elapsed = sum(r.elapsed for r in results)
+    failed = sum(1 for r in results if r.status != 0)
+    rate = len(results) / elapsed if elapsed else 0.0
+    print(f"{len(results)} commands, {failed} failed, {rate:.0f} commands/s", file=sys.stderr)
+    sys.exit(1 if failed else 0)
+
 
 if __name__ == '__main__':
-    emulator = ShellEmulator('config.toml')  
-    emulator.run()
-    '''unittest.main()'''
+    main()
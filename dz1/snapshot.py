@@ -0,0 +1,87 @@
+import os
+import sys
+import struct
+import marshal
+
+# Снимок разобранной конфигурации и индекса VFS. Пишется только по запросу
+# (ShellEmulator(..., snapshot_path=...) или --snapshot); путь по умолчанию —
+# рядом с конфигурацией (snapshot_path).
+# Формат: магия, длина заголовка, заголовок (marshal: версия, штамп
+# конфигурации, сама конфигурация), затем индекс архива (marshal). Заголовок
+# читается при запуске, индекс — только при первом открытии VFS.
+SNAPSHOT_MAGIC = b'DZ1S'
+SNAPSHOT_VERSION = 1
+SNAPSHOT_SUFFIX = '.snapshot'
+_PREFIX = struct.Struct('<4sI')
+
+
+def snapshot_path(config_file):
+    """Путь снимка по умолчанию: рядом с файлом конфигурации."""
+    return config_file + SNAPSHOT_SUFFIX
+
+
+def _stamp(path):
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+def _read_header(f, config_file):
+    """Читает и проверяет заголовок; None, если снимок устарел или повреждён."""
+    try:
+        magic, length = _PREFIX.unpack(f.read(_PREFIX.size))
+        if magic != SNAPSHOT_MAGIC:
+            return None
+        header = marshal.loads(f.read(length))
+    except (struct.error, EOFError, ValueError, TypeError):
+        return None
+    if (not isinstance(header, dict)
+            or header.get('version') != SNAPSHOT_VERSION
+            or header.get('python') != sys.hexversion
+            or header.get('config_stamp') != _stamp(config_file)):
+        return None
+    return header
+
+
+def load(path, config_file):
+    """Возвращает конфигурацию из снимка path или None, если снимка нет или он устарел."""
+    try:
+        with open(path, 'rb') as f:
+            header = _read_header(f, config_file)
+    except FileNotFoundError:
+        return None
+    return header['config'] if header is not None else None
+
+
+def load_index(path, config_file):
+    """Возвращает индекс архива из снимка — пару (ключ архива, записи) — или None."""
+    try:
+        with open(path, 'rb') as f:
+            if _read_header(f, config_file) is None:
+                return None
+            return marshal.loads(f.read())
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+
+
+def save(path, config_file, config, index=None):
+    """Атомарно записывает снимок в path; молча пропускает, если это невозможно."""
+    header = {
+        'version': SNAPSHOT_VERSION,
+        'python': sys.hexversion,
+        'config_stamp': _stamp(config_file),
+        'config': config,
+    }
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        head = marshal.dumps(header)
+        body = marshal.dumps(index)
+        with open(tmp_path, 'wb') as f:
+            f.write(_PREFIX.pack(SNAPSHOT_MAGIC, len(head)))
+            f.write(head)
+            f.write(body)
+        os.replace(tmp_path, path)
+    except ValueError:
+        pass  # В конфигурации есть значения, которые marshal не сохраняет (например, даты TOML)
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
@@ -0,0 +1,320 @@
+import os
+import unittest
+
+from shell_emulator import ShellEmulator
+from vfs import OverlayFS, VirtualFS
+
+
+def make_shell_fixture(test, entries):
+    """Создаёт во временном каталоге vfs.zip с entries и config.toml, указывающий на него.
+
+    entries — аргументы ZipFile.writestr. Пути сохраняются в test.tmp,
+    test.zip_path и test.config_path; каталог удаляется после теста.
+    """
+    import tempfile
+    import zipfile
+    test.tmp = tempfile.TemporaryDirectory()
+    test.addCleanup(test.tmp.cleanup)
+    test.zip_path = os.path.join(test.tmp.name, 'vfs.zip')
+    test.config_path = os.path.join(test.tmp.name, 'config.toml')
+    with zipfile.ZipFile(test.zip_path, 'w') as zf:
+        for entry in entries:
+            zf.writestr(*entry)
+    with open(test.config_path, 'w') as f:
+        f.write(f'username = "user"\nvfs_path = "{test.zip_path}"\n')
+
+
+class TestShellEmulator(unittest.TestCase):
+
+    def setUp(self):
+        make_shell_fixture(self, [
+            ('test_dir/file1.txt', 'one'),
+            ('test_dir/file2.txt', 'two'),
+            ('empty_dir/', ''),
+            ('file1.txt', 'root'),
+            ('my file.txt', 'spaced'),
+        ])
+        self.emulator = ShellEmulator(self.config_path)
+
+    def tearDown(self):
+        if self.emulator._vfs is not None:
+            self.emulator._vfs.close()
+
+    def test_ls_empty(self):
+        self.emulator.cd('/empty_dir')
+        self.emulator.ls()
+        self.assertEqual(self.emulator.ls(), "No files found in the directory.")
+
+    def test_ls_files(self):
+        self.emulator.ls('/test_dir')
+        self.assertIn("test_dir/", self.emulator.ls())
+        self.assertIn("file1.txt", self.emulator.ls('/test_dir'))
+        self.assertIn("file2.txt", self.emulator.ls('/test_dir'))
+
+    def test_cd_root(self):
+        self.emulator.cd('/')
+        self.assertEqual(self.emulator.current_dir, '/')
+
+    def test_cd_subdir(self):
+        self.emulator.cd('test_dir')
+        self.assertEqual(self.emulator.current_dir, '/test_dir')
+
+    def test_date(self):
+        self.emulator.date()
+        self.assertIsInstance(self.emulator.date(), str)
+
+    def test_chown(self):
+        self.emulator.chown('test_dir/file1.txt', 'user1')
+        self.assertEqual(self.emulator.chown('test_dir/file1.txt', 'user1'), "chown: user1 test_dir/file1.txt")
+
+    def test_history_empty(self):
+        self.assertEqual(self.emulator.history(), "No commands in history.")
+
+    def test_history_filled(self):
+        self.emulator.run_script(['ls', 'cd test_dir'])
+        history = self.emulator.history()
+        self.assertIn("ls", history)
+        self.assertIn("cd test_dir", history)
+
+    def test_run_script(self):
+        results = self.emulator.run_script(['chown file1.txt user1', 'foo', 'exit', 'date'])
+        self.assertEqual([r.status for r in results], [0, 127, 0])
+        self.assertEqual(results[0].stdout, "chown: user1 file1.txt\n")
+        self.assertEqual(results[1].stdout, "Unknown command: foo\n")
+
+    def test_find(self):
+        results = self.emulator.run_script(['find', 'find / "file*"', 'find test_dir/file1.txt'])
+        self.assertEqual(results[0].stdout.splitlines(), ['/test_dir/', '/test_dir/file1.txt', '/test_dir/file2.txt',
+                                                          '/empty_dir/', '/file1.txt', '/my file.txt'])
+        self.assertEqual(results[1].stdout.splitlines(), ['/test_dir/file1.txt', '/test_dir/file2.txt', '/file1.txt'])
+        self.assertEqual(results[2].stdout, '/test_dir/file1.txt\n')
+
+    def test_du_after_overlay_changes(self):
+        results = self.emulator.run_script(['du', 'rm test_dir/file2.txt', 'touch test_dir/new.txt', 'du',
+                                            'du test_dir'])
+        self.assertEqual(results[0].stdout, '6\t/test_dir\n0\t/empty_dir\n16\t/\n')
+        self.assertEqual(results[3].stdout, '3\t/test_dir\n0\t/empty_dir\n13\t/\n')
+        self.assertEqual(results[4].stdout, '3\t/test_dir\n')
+
+    def test_tree(self):
+        results = self.emulator.run_script(['tree', 'rm test_dir/file2.txt', 'tree test_dir'])
+        self.assertEqual(results[0].stdout, '/\n├── test_dir/\n│   ├── file1.txt\n│   └── file2.txt\n'
+                                            '├── empty_dir/\n├── file1.txt\n└── my file.txt\n')
+        self.assertEqual(results[2].stdout, '/test_dir\n└── file1.txt\n')
+
+    def test_output_limit(self):
+        result, _ = self.emulator.execute_captured('find', limit=15)
+        self.assertEqual(result.status, 1)
+        self.assertEqual(result.stdout, '/test_dir/\n/tes\nOutput truncated at 15 characters.\n')
+        result, _ = self.emulator.execute_captured('find test_dir', limit=1000)
+        self.assertEqual(result.status, 0)
+
+    def test_dispatch_table(self):
+        self.assertNotIn('run', ShellEmulator.COMMANDS)
+        self.assertEqual(self.emulator.execute('run'), 127)
+        self.assertEqual(self.emulator.execute('chown a'), 2)
+        results = self.emulator.run_script(['chown "my file.txt" user1'])
+        self.assertEqual(results[0].stdout, "chown: user1 my file.txt\n")
+
+
+class TestVirtualFS(unittest.TestCase):
+
+    def setUp(self):
+        import tempfile
+        import zipfile
+        fd, self.zip_path = tempfile.mkstemp(suffix='.zip')
+        os.close(fd)
+        with zipfile.ZipFile(self.zip_path, 'w') as zf:
+            zf.writestr('test_dir/file1.txt', 'one')
+            zf.writestr('test_dir/sub/file2.txt', 'two')
+        self.vfs = VirtualFS(self.zip_path)
+
+    def tearDown(self):
+        self.vfs.close()
+        os.remove(self.zip_path)
+
+    def test_list_dir(self):
+        self.assertEqual(list(self.vfs.list_dir('/test_dir')), ['file1.txt', 'sub/'])
+        self.assertIsNone(self.vfs.list_dir('/missing'))
+
+    def test_walk_and_sizes(self):
+        paths = [n.path for n in self.vfs.walk(self.vfs.root)]
+        self.assertEqual(paths, ['', 'test_dir/', 'test_dir/file1.txt', 'test_dir/sub/', 'test_dir/sub/file2.txt'])
+        self.assertEqual(self.vfs.lookup('/test_dir').size, 6)
+        self.assertEqual(self.vfs.lookup('/test_dir/sub').size, 3)
+
+    def test_read(self):
+        self.assertEqual(self.vfs.read('/test_dir/sub/file2.txt'), b'two')
+
+    def test_stored_content_is_view(self):
+        self.assertIsInstance(self.vfs.content('/test_dir/file1.txt'), memoryview)
+        self.assertEqual(bytes(self.vfs.content('/test_dir/file1.txt')), b'one')
+
+    def test_compressed_content_cached(self):
+        import zipfile
+        with zipfile.ZipFile(self.zip_path, 'a', zipfile.ZIP_DEFLATED) as zf:
+            zf.writestr('packed.txt', 'x' * 1000)
+        os.utime(self.zip_path, ns=(0, 0))
+        self.assertEqual(self.vfs.read('/packed.txt'), b'x' * 1000)
+        self.assertEqual(self.vfs.read('/packed.txt'), b'x' * 1000)
+        self.assertEqual(b''.join(self.vfs.iter_chunks('/packed.txt')), b'x' * 1000)
+        self.assertEqual(self.vfs.cache.stats()['hits'], 2)
+        self.assertEqual(self.vfs.cache.stats()['misses'], 1)
+
+    def test_rebuild_on_change(self):
+        import zipfile
+        with zipfile.ZipFile(self.zip_path, 'a') as zf:
+            zf.writestr('new_dir/file3.txt', 'three')
+        os.utime(self.zip_path, ns=(0, 0))
+        self.assertTrue(self.vfs.is_dir('/new_dir'))
+
+    def test_overlay(self):
+        fs = OverlayFS(self.vfs)
+        fs.touch('/test_dir/new.txt')
+        fs.remove('/test_dir/sub')
+        fs.chown('/test_dir/file1.txt', 'user1')
+        self.assertEqual(list(fs.list_dir('/test_dir')), ['file1.txt', 'new.txt'])
+        self.assertEqual(fs.read('/test_dir/new.txt'), b'')
+        self.assertEqual(fs.lookup('/test_dir').size, 3)
+        self.assertEqual(fs.owner('/test_dir/file1.txt'), 'user1')
+        with self.assertRaises(FileNotFoundError):
+            fs.touch('/missing/new.txt')
+
+    def test_overlays_are_isolated(self):
+        first, second = OverlayFS(self.vfs), OverlayFS(self.vfs)
+        first.remove('/test_dir/sub')
+        self.assertFalse(first.exists('/test_dir/sub'))
+        self.assertTrue(second.is_dir('/test_dir/sub'))
+        self.assertTrue(self.vfs.is_dir('/test_dir/sub'))
+        self.assertEqual(self.vfs.lookup('/test_dir').size, 6)
+
+    def test_commit(self):
+        import zipfile
+        fs = OverlayFS(self.vfs)
+        fs.touch('/test_dir/new.txt')
+        fs.remove('/test_dir/sub/file2.txt')
+        fs.chown('/test_dir/file1.txt', 'user1')
+        self.assertEqual(fs.commit(), 3)
+        with zipfile.ZipFile(self.zip_path) as zf:
+            self.assertEqual(zf.namelist(), ['test_dir/file1.txt', 'test_dir/new.txt', 'test_dir/sub/'])
+        self.assertEqual(len(fs.overlay), 0)
+        self.assertEqual(fs.owner('/test_dir/file1.txt'), 'user1')
+        self.assertEqual(fs.read('/test_dir/file1.txt'), b'one')
+        self.assertTrue(fs.is_dir('/test_dir/sub'))
+
+class TestSnapshot(unittest.TestCase):
+
+    def setUp(self):
+        import zipfile
+        make_shell_fixture(self, [
+            ('test_dir/file1.txt', 'one'),
+            ('test_dir/packed.txt', 'x' * 100, zipfile.ZIP_DEFLATED),
+        ])
+        os.mkdir(os.path.join(self.tmp.name, 'cache'))
+        self.snapshot_path = os.path.join(self.tmp.name, 'cache', 'shell.snapshot')
+
+    def test_no_snapshot_by_default(self):
+        ShellEmulator(self.config_path).base_vfs.close()
+        self.assertEqual(sorted(os.listdir(self.tmp.name)), ['cache', 'config.toml', 'vfs.zip'])
+        self.assertEqual(os.listdir(os.path.join(self.tmp.name, 'cache')), [])
+
+    def test_index_from_snapshot(self):
+        from vfs import EntryInfo
+        first = ShellEmulator(self.config_path, snapshot_path=self.snapshot_path)
+        self.assertNotIsInstance(first.base_vfs._entries[0], EntryInfo)
+        first.base_vfs.close()
+        self.assertTrue(os.path.exists(self.snapshot_path))
+        second = ShellEmulator(self.config_path, snapshot_path=self.snapshot_path)
+        self.assertEqual(second.username, 'user')
+        self.assertIsInstance(second.base_vfs._entries[0], EntryInfo)
+        self.assertEqual(list(second.base_vfs.list_dir('/test_dir')), ['file1.txt', 'packed.txt'])
+        self.assertEqual(second.base_vfs.read('/test_dir/packed.txt'), b'x' * 100)
+        second.base_vfs.close()
+
+    def test_stale_snapshot(self):
+        import zipfile
+        ShellEmulator(self.config_path, snapshot_path=self.snapshot_path).base_vfs.close()
+        with zipfile.ZipFile(self.zip_path, 'a') as zf:
+            zf.writestr('new_dir/file3.txt', 'three')
+        emulator = ShellEmulator(self.config_path, snapshot_path=self.snapshot_path)
+        self.assertTrue(emulator.base_vfs.is_dir('/new_dir'))
+        emulator.base_vfs.close()
+
+
+class TestShellServer(unittest.TestCase):
+
+    def setUp(self):
+        make_shell_fixture(self, [('test_dir/file1.txt', 'one'), ('file1.txt', 'root')])
+        self.emulator = ShellEmulator(self.config_path)
+
+    def tearDown(self):
+        if self.emulator._vfs is not None:
+            self.emulator._vfs.close()
+
+    def test_concurrent_sessions(self):
+        import asyncio
+        from server import ShellServer
+
+        server = ShellServer(self.emulator)
+
+        async def prompt(reader):
+            return (await reader.readuntil(b'$ ')).decode('utf-8')
+
+        async def scenario():
+            listener = await asyncio.start_server(server.handle, '127.0.0.1', 0)
+            port = listener.sockets[0].getsockname()[1]
+            async with listener:
+                first = await asyncio.open_connection('127.0.0.1', port)
+                second = await asyncio.open_connection('127.0.0.1', port)
+                self.assertEqual(await prompt(first[0]), 'user@/$ ')
+                self.assertEqual(await prompt(second[0]), 'user@/$ ')
+                self.assertEqual(len(server.metrics()['active']), 2)
+
+                first[1].write(b'cd test_dir\n')
+                self.assertEqual(await prompt(first[0]), 'user@/test_dir$ ')
+                second[1].write(b'chown file1.txt user1\n')
+                self.assertEqual(await prompt(second[0]), 'chown: user1 file1.txt\nuser@/$ ')
+                second[1].write(b'commit\n')
+                self.assertIn('user@/$ ', await prompt(second[0]))
+
+                for reader, writer in (first, second):
+                    writer.write(b'exit\n')
+                    await reader.read()
+                    writer.close()
+                    await writer.wait_closed()
+            return server.metrics()
+
+        report = asyncio.run(scenario())
+        self.assertEqual(report['active'], [])
+        finished = sorted(report['finished'], key=lambda m: m['session'])
+        self.assertEqual([m['commands'] for m in finished], [2, 3])
+        self.assertEqual([m['errors'] for m in finished], [0, 1])
+        self.assertNotEqual(self.emulator.vfs.owner('/file1.txt'), 'user1')
+
+    def test_output_limit(self):
+        import asyncio
+        from server import ShellServer
+
+        server = ShellServer(self.emulator, output_limit=25)
+
+        async def scenario():
+            listener = await asyncio.start_server(server.handle, '127.0.0.1', 0)
+            port = listener.sockets[0].getsockname()[1]
+            async with listener:
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+                await reader.readuntil(b'$ ')
+                writer.write(b'find\n')
+                output = (await reader.readuntil(b'$ ')).decode('utf-8')
+                writer.write(b'exit\n')
+                await reader.read()
+                writer.close()
+                await writer.wait_closed()
+            return output
+
+        output = asyncio.run(scenario())
+        self.assertEqual(output, '/test_dir/\n/test_dir/file\nOutput truncated at 25 characters.\nuser@/$ ')
+        self.assertEqual(server.metrics()['finished'][0]['errors'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
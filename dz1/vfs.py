@@ -0,0 +1,694 @@
+import abc
+import mmap
+import os
+import time
+import struct
+
+# zipfile, hashlib, tempfile и shutil импортируются по мере надобности: при
+# загрузке индекса из снимка оглавление архива не разбирается вовсе.
+from collections import OrderedDict
+
+# Локальный заголовок записи zip: сигнатура и фиксированные поля, 30 байт
+_LOCAL_HEADER = struct.Struct('<4sHHHHHIIIHH')
+_LOCAL_HEADER_MAGIC = b'PK\x03\x04'
+_CHUNK_SIZE = 64 * 1024
+_OWNER_PREFIX = b'owner='  # Владелец хранится в комментарии записи архива
+_ZIP_STORED = 0
+# Запись конца центрального каталога и её вариант для zip64
+_END_RECORD = struct.Struct('<4sHHHHIIH')
+_END_MAGIC = b'PK\x05\x06'
+_END_SEARCH = _END_RECORD.size + 0xFFFF  # Запись плюс комментарий максимальной длины
+_ZIP64_LOCATOR = struct.Struct('<4sIQI')
+_ZIP64_LOCATOR_MAGIC = b'PK\x06\x07'
+_ZIP64_RECORD = struct.Struct('<4sQHHIIQQQQ')
+
+
+class ContentCache:
+    """LRU-кэш распакованного содержимого с ограничением по суммарному размеру."""
+
+    def __init__(self, max_bytes=32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._items = OrderedDict()
+
+    def get(self, key):
+        data = self._items.get(key)
+        if data is None:
+            self.misses += 1
+            return None
+        self._items.move_to_end(key)
+        self.hits += 1
+        return data
+
+    def put(self, key, data):
+        if len(data) > self.max_bytes:
+            return
+        old = self._items.pop(key, None)
+        if old is not None:
+            self.size -= len(old)
+        self._items[key] = data
+        self.size += len(data)
+        while self.size > self.max_bytes:
+            _, evicted = self._items.popitem(last=False)
+            self.size -= len(evicted)
+            self.evictions += 1
+
+    def clear(self):
+        self._items.clear()
+        self.size = 0
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'entries': len(self._items),
+            'bytes': self.size,
+        }
+
+
+class EntryInfo:
+    """Запись оглавления архива, восстановленная из снимка индекса.
+
+    Повторяет поля ZipInfo, которые использует VirtualFS.
+    """
+    __slots__ = ("filename", "file_size", "compress_type", "flag_bits", "header_offset",
+                 "comment", "date_time", "external_attr", "create_system")
+
+    def __init__(self, filename, file_size, compress_type, flag_bits, header_offset,
+                 comment, date_time, external_attr, create_system):
+        self.filename = filename
+        self.file_size = file_size
+        self.compress_type = compress_type
+        self.flag_bits = flag_bits
+        self.header_offset = header_offset
+        self.comment = comment
+        self.date_time = date_time
+        self.external_attr = external_attr
+        self.create_system = create_system
+
+    def is_dir(self):
+        return self.filename.endswith('/')
+
+
+class VFSNode:
+    """Узел дерева виртуальной файловой системы (файл или каталог)."""
+    __slots__ = ("name", "path", "info", "children", "size")
+
+    def __init__(self, name, path, info=None, is_dir=True):
+        self.name = name          # Имя узла без пути
+        self.path = path          # Имя записи в архиве (у каталогов оканчивается на '/')
+        self.info = info          # ZipInfo, если запись явно есть в архиве
+        self.children = {} if is_dir else None
+        self.size = info.file_size if info is not None and not is_dir else 0  # У каталогов — суммарный
+
+    @property
+    def is_dir(self):
+        return self.children is not None
+
+    @property
+    def display_name(self):
+        return self.name + '/' if self.is_dir else self.name
+
+
+class DirListing:
+    """Ленивое содержимое каталога: имена отдаются по мере обхода без копирования."""
+
+    def __init__(self, node):
+        self.node = node
+
+    def __iter__(self):
+        for child in self.node.children.values():
+            yield child.display_name
+
+    def __contains__(self, name):
+        return name.rstrip('/') in self.node.children
+
+    def __len__(self):
+        return len(self.node.children)
+
+    def __bool__(self):
+        return bool(self.node.children)
+
+
+class Overlay:
+    """Изменения поверх архива: новые и удалённые записи, владельцы.
+
+    Живёт в памяти до явного VirtualFS.commit, поэтому изменяющие команды
+    не трогают архив.
+    """
+
+    def __init__(self):
+        self.files = {}       # Имя записи -> содержимое нового файла
+        self.deleted = set()  # Удалённые записи архива (каталоги — с '/' на конце)
+        self.owners = {}      # Имя записи -> владелец
+        self.dirs = set()     # Каталоги, которые после удалений надо сохранить явной записью
+
+    def __len__(self):
+        return len(self.files) + len(self.deleted) + len(self.owners)
+
+    def is_deleted(self, name):
+        """Удалена ли запись сама или вместе с одним из каталогов-предков."""
+        if name in self.deleted:
+            return True
+        end = name.rfind('/', 0, len(name) - 1)
+        while end != -1:
+            if name[:end + 1] in self.deleted:
+                return True
+            end = name.rfind('/', 0, end)
+        return False
+
+    def forget(self, prefix):
+        """Убирает новые файлы, владельцев и каталоги внутри удалённого каталога."""
+        for table in (self.files, self.owners):
+            for name in [n for n in table if n.startswith(prefix)]:
+                del table[name]
+        self.dirs = {name for name in self.dirs if not name.startswith(prefix)}
+
+
+class BaseFS(abc.ABC):
+    """Общие запросы к дереву файлов; наследнику нужны только lookup() и content()."""
+
+    @abc.abstractmethod
+    def lookup(self, path):
+        """Возвращает узел по пути или None, если его нет."""
+
+    @abc.abstractmethod
+    def content(self, path):
+        """Возвращает содержимое файла как bytes-подобный объект."""
+
+    def exists(self, path):
+        return self.lookup(path) is not None
+
+    def is_dir(self, path):
+        node = self.lookup(path)
+        return node is not None and node.is_dir
+
+    def list_dir(self, path):
+        """Возвращает ленивое содержимое каталога или None, если это не каталог."""
+        node = self.lookup(path)
+        if node is None or not node.is_dir:
+            return None
+        return DirListing(node)
+
+    def _file_node(self, path):
+        node = self.lookup(path)
+        if node is None or node.is_dir:
+            raise FileNotFoundError(f"No such file: {path}")
+        return node
+
+    def read(self, path):
+        """Возвращает содержимое файла в байтах."""
+        return bytes(self.content(path))
+
+
+class VirtualFS(BaseFS):
+    """Виртуальная файловая система поверх zip-архива.
+
+    Архив открывается один раз, по его оглавлению строится дерево каталогов.
+    При изменении mtime или размера архива индекс перестраивается.
+    Индекс только читается и может разделяться между сессиями; изменения
+    каждой сессии живут в её OverlayFS и попадают в архив только при commit.
+    """
+
+    def __init__(self, zip_path, cache_bytes=32 * 1024 * 1024, index=None):
+        self.zip_path = zip_path
+        self.cache = ContentCache(cache_bytes)
+        self._zip = None
+        self._file = None
+        self._mmap = None
+        self._stamp = None
+        self.root = None
+        self.index_key = None  # (mtime, размер, хэш центрального каталога) архива
+        self._entries = []  # Записи оглавления в порядке архива
+        self._snapshot = index  # (ключ, записи) из снимка; используется один раз
+        self.version = 0  # Увеличивается при каждой перестройке индекса
+        self._refresh()
+
+    def _stat_stamp(self):
+        st = os.stat(self.zip_path)
+        return st.st_mtime_ns, st.st_size
+
+    def _refresh(self):
+        """Перестраивает индекс, если архив изменился с момента последнего чтения."""
+        stamp = self._stat_stamp()
+        if stamp == self._stamp:
+            return
+        self.close()
+        self._file = open(self.zip_path, 'rb')
+        if stamp[1]:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        key = stamp + (self._directory_digest(),)
+        if self._snapshot is not None and tuple(self._snapshot[0]) == key:
+            self._entries = [EntryInfo(*row) for row in self._snapshot[1]]
+        else:
+            self._entries = self._archive().infolist()
+        self._snapshot = None
+        self.index_key = key
+        self.root = self._build_index(self._entries)
+        self._stamp = stamp
+        self.version += 1
+
+    def _archive(self):
+        """ZipFile над открытым архивом; создаётся при первом обращении."""
+        if self._zip is None:
+            import zipfile
+            self._zip = zipfile.ZipFile(self._file, 'r')
+        return self._zip
+
+    def _directory_digest(self):
+        """Хэш центрального каталога архива вместе с записью его конца."""
+        import hashlib
+        mm = self._mmap
+        if mm is None:
+            return ''
+        end = mm.rfind(_END_MAGIC, max(0, len(mm) - _END_SEARCH))
+        if end < 0:
+            import zipfile
+            raise zipfile.BadZipFile(f"File is not a zip file: {self.zip_path}")
+        directory_size = _END_RECORD.unpack_from(mm, end)[5]
+        locator = end - _ZIP64_LOCATOR.size
+        if locator >= 0 and mm[locator:locator + 4] == _ZIP64_LOCATOR_MAGIC:
+            end = _ZIP64_LOCATOR.unpack_from(mm, locator)[2]
+            directory_size = _ZIP64_RECORD.unpack_from(mm, end)[8]
+        with memoryview(mm) as view, view[max(0, end - directory_size):] as tail:
+            return hashlib.blake2b(tail, digest_size=16).hexdigest()
+
+    def index(self):
+        """Ключ архива и записи оглавления в виде, пригодном для снимка."""
+        fields = EntryInfo.__slots__
+        rows = [tuple(getattr(info, field) for field in fields) for info in self._entries]
+        return self.index_key, rows
+
+    def revision(self):
+        """Номер версии индекса с учётом возможного изменения архива."""
+        self._refresh()
+        return self.version
+
+    @staticmethod
+    def _build_index(infolist):
+        """Строит дерево каталогов по списку записей архива.
+
+        Размеры каталогов накапливаются здесь же, чтобы du не обходил дерево.
+        """
+        root = VFSNode('', '')
+        for info in infolist:
+            parts = [p for p in info.filename.split('/') if p]
+            if not parts:
+                continue
+            size = 0 if info.is_dir() else info.file_size
+            root.size += size
+            node = root
+            prefix = ''
+            for part in parts[:-1]:
+                prefix += part + '/'
+                child = node.children.get(part)
+                if child is None:
+                    child = node.children[part] = VFSNode(part, prefix)
+                child.size += size
+                node = child
+            name = parts[-1]
+            if info.is_dir():
+                child = node.children.get(name)
+                if child is None:
+                    child = node.children[name] = VFSNode(name, prefix + name + '/')
+                child.info = info
+            else:
+                node.children[name] = VFSNode(name, info.filename, info, is_dir=False)
+        return root
+
+    @staticmethod
+    def _split(path):
+        return [p for p in path.split('/') if p and p != '.']
+
+    def lookup(self, path):
+        """Возвращает узел по пути или None, если его нет."""
+        self._refresh()
+        return self._resolve(self.root, path)
+
+    @classmethod
+    def _resolve(cls, root, path):
+        node = root
+        for part in cls._split(path):
+            if not node.is_dir:
+                return None
+            node = node.children.get(part)
+            if node is None:
+                return None
+        return node
+
+    def walk(self, node):
+        """Обходит поддерево узла в глубину, включая сам узел.
+
+        Стек хранит итераторы по детям, а не сами списки детей, поэтому
+        память растёт только с глубиной дерева.
+        """
+        yield node
+        if not node.is_dir:
+            return
+        stack = [iter(node.children.values())]
+        while stack:
+            child = next(stack[-1], None)
+            if child is None:
+                stack.pop()
+                continue
+            yield child
+            if child.is_dir:
+                stack.append(iter(child.children.values()))
+
+    def walk_tree(self, node):
+        """Как walk, но отдаёт пары (глубина, узел, последний ли среди соседей)."""
+        yield 0, node, True
+        if not node.is_dir:
+            return
+        stack = [self._peekable(node.children.values())]
+        while stack:
+            item = next(stack[-1], None)
+            if item is None:
+                stack.pop()
+                continue
+            child, is_last = item
+            yield len(stack), child, is_last
+            if child.is_dir:
+                stack.append(self._peekable(child.children.values()))
+
+    @staticmethod
+    def _peekable(nodes):
+        """Отдаёт пары (узел, последний ли он) с упреждением на один элемент."""
+        it = iter(nodes)
+        current = next(it, None)
+        while current is not None:
+            following = next(it, None)
+            yield current, following is None
+            current = following
+
+    def _data_offset(self, info):
+        """Смещение начала данных записи внутри архива."""
+        header = _LOCAL_HEADER.unpack_from(self._mmap, info.header_offset)
+        if header[0] != _LOCAL_HEADER_MAGIC:
+            import zipfile
+            raise zipfile.BadZipFile(f"Bad local header for {info.filename}")
+        return info.header_offset + _LOCAL_HEADER.size + header[9] + header[10]
+
+    def _is_mappable(self, info):
+        return (self._mmap is not None
+                and info.compress_type == _ZIP_STORED
+                and not info.flag_bits & 0x1)
+
+    def content(self, path):
+        """Возвращает содержимое файла как bytes-подобный объект."""
+        return self.entry_content(self._file_node(path).info)
+
+    def entry_content(self, info):
+        """Содержимое записи архива.
+
+        Несжатые записи отдаются срезом memoryview над отображением архива
+        без копирования, сжатые распаковываются и кладутся в LRU-кэш.
+        """
+        if self._is_mappable(info):
+            start = self._data_offset(info)
+            return memoryview(self._mmap)[start:start + info.file_size]
+        key = (self.version, info.filename)
+        data = self.cache.get(key)
+        if data is None:
+            data = b''.join(self._iter_compressed(info))
+            self.cache.put(key, data)
+        return data
+
+    def iter_chunks(self, path, chunk_size=_CHUNK_SIZE):
+        """Потоково отдаёт содержимое файла кусками, не читая его целиком."""
+        return self.entry_chunks(self._file_node(path).info, chunk_size)
+
+    def entry_chunks(self, info, chunk_size=_CHUNK_SIZE):
+        if self._is_mappable(info):
+            view = self.entry_content(info)
+            for start in range(0, len(view), chunk_size):
+                yield view[start:start + chunk_size]
+            return
+        cached = self.cache.get((self.version, info.filename))
+        if cached is not None:
+            yield cached
+            return
+        yield from self._iter_compressed(info, chunk_size)
+
+    def _iter_compressed(self, info, chunk_size=_CHUNK_SIZE):
+        with self._archive().open(info.filename) as f:
+            while chunk := f.read(chunk_size):
+                yield chunk
+
+    def commit(self, overlay, target=None):
+        """Записывает архив с изменениями оверлея одним последовательным проходом.
+
+        Архив собирается во временном файле рядом с целевым и подменяет его
+        атомарно. Если целевой архив — текущий, перед подменой он закрывается
+        (Windows не даёт заменить открытый файл), а затем открывается заново
+        и индекс перестраивается. Возвращает число применённых изменений.
+        """
+        import shutil
+        import zipfile
+        import tempfile
+        self._refresh()
+        target = target or self.zip_path
+        replaces_self = os.path.abspath(target) == os.path.abspath(self.zip_path)
+        pending = len(overlay)
+        written = set()
+        fd, tmp_path = tempfile.mkstemp(suffix='.zip', dir=os.path.dirname(os.path.abspath(target)))
+        try:
+            with os.fdopen(fd, 'wb') as f, zipfile.ZipFile(f, 'w') as out:
+                for info in self._entries:
+                    if overlay.is_deleted(info.filename):
+                        continue
+                    source, info = info, self._copy_info(info)
+                    owner = overlay.owners.get(info.filename)
+                    if owner is not None:
+                        info.comment = _OWNER_PREFIX + owner.encode('utf-8')
+                    if info.is_dir():
+                        out.writestr(info, b'')
+                    else:
+                        with self._archive().open(source.filename) as src, out.open(info, 'w') as dst:
+                            shutil.copyfileobj(src, dst, _CHUNK_SIZE)
+                    written.add(info.filename)
+                now = time.localtime()[:6]
+                kept = [name for name in overlay.dirs if not overlay.is_deleted(name)]
+                for name in list(overlay.files) + list(overlay.owners) + kept:
+                    if name in written:
+                        continue
+                    info = zipfile.ZipInfo(name, now)
+                    owner = overlay.owners.get(name)
+                    if owner is not None:
+                        info.comment = _OWNER_PREFIX + owner.encode('utf-8')
+                    out.writestr(info, overlay.files.get(name, b''))
+                    written.add(name)
+            if replaces_self:
+                self.close()
+                self._stamp = None
+            os.replace(tmp_path, target)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        finally:
+            if replaces_self and self._stamp is None:
+                self._refresh()
+        return pending
+
+    @staticmethod
+    def _copy_info(info):
+        """Копия заголовка записи для нового архива."""
+        import zipfile
+        copy = zipfile.ZipInfo(info.filename, info.date_time)
+        copy.compress_type = info.compress_type
+        copy.external_attr = info.external_attr
+        copy.create_system = info.create_system
+        copy.file_size = info.file_size
+        copy.comment = info.comment
+        return copy
+
+    @staticmethod
+    def _parent_name(name):
+        parent = name.rstrip('/').rpartition('/')[0]
+        return parent + '/' if parent else ''
+
+    def close(self):
+        if self._zip is not None:
+            self._zip.close()
+            self._zip = None
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                pass  # Остались срезы memoryview: отображение освободит сборщик мусора
+            self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self.cache.clear()
+
+
+class OverlayFS(BaseFS):
+    """Сессия поверх общего VirtualFS со своим оверлеем.
+
+    Общий индекс не меняется: изменяемые каталоги копируются по пути от
+    корня (копируется только словарь детей), остальные поддеревья разделяются
+    с базой. Поэтому chown, touch и rm не трогают архив и не видны другим
+    сессиям до commit.
+    """
+
+    def __init__(self, base):
+        self.base = base
+        self.overlay = Overlay()
+        self.changes = 0       # Число изменений, внесённых через оверлей
+        self._root = None
+        self._root_version = None
+        self._private = {}     # id -> каталог, скопированный в эту сессию
+
+    @property
+    def cache(self):
+        return self.base.cache
+
+    @property
+    def root(self):
+        """Корень дерева сессии; после перестройки базы оверлей накладывается заново."""
+        version = self.base.revision()
+        if version != self._root_version:
+            self._root = self.base.root
+            self._root_version = version
+            self._private = {}
+            for name in self.overlay.deleted:
+                self._detach(name)
+            for name, data in self.overlay.files.items():
+                self._attach(name, data)
+        return self._root
+
+    def revision(self):
+        """Версия базового индекса и число изменений сессии."""
+        return self.base.revision(), self.changes
+
+    def lookup(self, path):
+        """Возвращает узел по пути или None, если его нет."""
+        return VirtualFS._resolve(self.root, path)
+
+    def walk(self, node):
+        return self.base.walk(node)
+
+    def walk_tree(self, node):
+        return self.base.walk_tree(node)
+
+    def content(self, path):
+        """Содержимое файла: новые файлы берутся из оверлея, остальные из архива."""
+        node = self._file_node(path)
+        if node.info is None:
+            return self.overlay.files[node.path]
+        return self.base.entry_content(node.info)
+
+    def iter_chunks(self, path, chunk_size=_CHUNK_SIZE):
+        node = self._file_node(path)
+        if node.info is None:
+            return iter([self.overlay.files[node.path]])
+        return self.base.entry_chunks(node.info, chunk_size)
+
+    def _own(self, node):
+        """Каталог, принадлежащий сессии: сам узел или его копия."""
+        if id(node) in self._private:
+            return node
+        copy = VFSNode(node.name, node.path, node.info)
+        copy.children = dict(node.children)
+        copy.size = node.size
+        self._private[id(copy)] = copy
+        return copy
+
+    def _own_chain(self, name):
+        """Свои копии каталогов от корня до родителя записи (или None) и имя записи."""
+        parts = [p for p in name.split('/') if p]
+        node = self._root
+        for part in parts[:-1]:
+            node = node.children.get(part)
+            if node is None or not node.is_dir:
+                return None, parts[-1]
+        self._root = self._own(self._root)
+        chain = [self._root]
+        for part in parts[:-1]:
+            child = chain[-1].children[part] = self._own(chain[-1].children[part])
+            chain.append(child)
+        return chain, parts[-1]
+
+    def _attach(self, name, data):
+        """Добавляет в дерево новый файл; None, если нет родительского каталога."""
+        chain, leaf = self._own_chain(name)
+        if chain is None:
+            return None
+        node = chain[-1].children[leaf] = VFSNode(leaf, name, is_dir=False)
+        node.size = len(data)
+        for parent in chain:
+            parent.size += node.size
+        return node
+
+    def _detach(self, name):
+        """Отцепляет узел от дерева, вычитая его размер из размеров предков."""
+        chain, leaf = self._own_chain(name)
+        node = chain[-1].children.pop(leaf, None) if chain is not None else None
+        if node is not None:
+            for parent in chain:
+                parent.size -= node.size
+        return node
+
+    def chown(self, path, user):
+        """Меняет владельца файла или каталога."""
+        node = self.lookup(path)
+        if node is None or node is self._root:
+            raise FileNotFoundError(f"No such file or directory: {path}")
+        self.overlay.owners[node.path] = user
+        self.changes += 1
+
+    def owner(self, path):
+        """Владелец узла из оверлея или из комментария записи архива."""
+        node = self.lookup(path)
+        if node is None:
+            raise FileNotFoundError(f"No such file or directory: {path}")
+        owner = self.overlay.owners.get(node.path)
+        if owner is None and node.info is not None and node.info.comment.startswith(_OWNER_PREFIX):
+            owner = node.info.comment[len(_OWNER_PREFIX):].decode('utf-8')
+        return owner
+
+    def touch(self, path):
+        """Создаёт пустой файл, если его ещё нет."""
+        node = self.lookup(path)
+        if node is not None:
+            return node
+        name = '/'.join(VirtualFS._split(path))
+        node = self._attach(name, b'')
+        if node is None:
+            raise FileNotFoundError(f"No such directory: {path.rsplit('/', 1)[0] or '/'}")
+        self.overlay.files[name] = b''
+        self.changes += 1
+        return node
+
+    def remove(self, path):
+        """Удаляет файл или каталог вместе с содержимым."""
+        node = self.lookup(path)
+        if node is None or node is self._root:
+            raise FileNotFoundError(f"No such file or directory: {path}")
+        self._detach(node.path)
+        overlay = self.overlay
+        if node.is_dir:
+            overlay.deleted.add(node.path)
+            overlay.forget(node.path)
+        else:
+            if node.info is not None:
+                overlay.deleted.add(node.path)
+            overlay.files.pop(node.path, None)
+            overlay.owners.pop(node.path, None)
+        parent = VirtualFS._parent_name(node.path)
+        if parent:
+            overlay.dirs.add(parent)
+        self.changes += 1
+
+    def commit(self, target=None):
+        """Записывает изменения сессии в архив; см. VirtualFS.commit."""
+        count = self.base.commit(self.overlay, target)
+        if target is None or os.path.abspath(target) == os.path.abspath(self.base.zip_path):
+            self.overlay = Overlay()
+            self._root_version = None
+        return count
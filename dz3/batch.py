@@ -0,0 +1,73 @@
+import os
+import sys
+import glob
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+from emitters import EMITTERS, get_emitter
+from translator import ConfigParser, map_file
+
+
+def collect_inputs(paths, pattern="*.txt"):
+    """Раскрывает каталоги в отсортированный список файлов по маске."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, pattern))))
+        else:
+            files.append(path)
+    return files
+
+
+def translate_file(path, output_format="yaml"):
+    """Переводит один файл и пишет результат рядом с ним.
+
+    Исключения не пробрасываются: возвращается тройка (вход, выход, ошибка),
+    чтобы ошибка в одном файле не прерывала весь пакет.
+    """
+    try:
+        emitter = get_emitter(output_format)
+        data = ConfigParser(map_file(path), streaming=True).parse()
+        output_path = os.path.splitext(path)[0] + emitter.suffix
+        emitter.dump_to_path(data, output_path)
+        return path, output_path, None
+    except Exception as e:
+        return path, None, f"{type(e).__name__}: {e}"
+
+
+def translate_batch(paths, output_format="yaml", workers=None):
+    """Переводит файлы в пуле процессов, по одному ConfigParser на файл."""
+    if not paths:
+        return []
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        return [translate_file(path, output_format) for path in paths]
+    # Крупные порции уменьшают накладные расходы на передачу задач между процессами
+    chunksize = max(1, len(paths) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(translate_file, paths, [output_format] * len(paths),
+                                 chunksize=chunksize))
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Пакетный перевод конфигурационных файлов.")
+    arg_parser.add_argument("inputs", nargs="+", help="Входные файлы или каталоги.")
+    arg_parser.add_argument("--format", choices=sorted(EMITTERS), default="yaml",
+                            help="Формат выходных файлов.")
+    arg_parser.add_argument("--workers", type=int, help="Число процессов (по умолчанию — число ядер).")
+    arg_parser.add_argument("--pattern", default="*.txt", help="Маска файлов внутри каталогов.")
+    args = arg_parser.parse_args()
+
+    results = translate_batch(collect_inputs(args.inputs, args.pattern), args.format, args.workers)
+    failed = 0
+    for path, _, error in results:
+        if error is not None:
+            failed += 1
+            print(f"Ошибка в {path}: {error}", file=sys.stderr)
+    print(f"Обработано файлов: {len(results)}, успешно: {len(results) - failed}, с ошибками: {failed}",
+          file=sys.stderr)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
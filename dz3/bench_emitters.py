@@ -0,0 +1,91 @@
+import os
+import re
+import sys
+import json
+import time
+import argparse
+
+import yaml
+
+from emitters import EMITTERS
+from translator import ConfigParser
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bench"))
+from generators import letters_name  # noqa: E402
+
+INPUTS = ["input1.txt", "input2.txt", "input3.txt", "input4.txt"]
+_DEFINITION_NAME = re.compile(r"^([A-Z_]+)(\s*:=)", re.MULTILINE)
+
+
+def scaled_input(copies):
+    """Склеивает input1–input4 copies раз, переименовывая определения верхнего уровня."""
+    texts = []
+    for name in INPUTS:
+        with open(name, "r", encoding="utf-8") as f:
+            texts.append(f.read())
+    source = "\n".join(texts)
+    parts = []
+    for i in range(copies):
+        suffix = "_" + letters_name(i)
+        parts.append(_DEFINITION_NAME.sub(lambda m: m.group(1) + suffix + m.group(2), source))
+    return "\n".join(parts)
+
+
+def _time(func, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def run(scales, repeat=3):
+    """Замеряет разбор и каждый формат вывода против чистого yaml.safe_dump."""
+    results = []
+    for copies in scales:
+        text = scaled_input(copies)
+        parse_time, data = _time(lambda: ConfigParser(text).parse(), repeat)
+        row = {"copies": copies, "input_bytes": len(text.encode("utf-8")), "parse_s": parse_time}
+        baseline, output = _time(lambda: yaml.safe_dump(data, default_flow_style=False, allow_unicode=True), repeat)
+        row["safe_dump"] = {"seconds": baseline, "bytes": len(output.encode("utf-8"))}
+        for name, emitter in EMITTERS.items():
+            if emitter.binary:
+                def dump():
+                    return emitter.encode(data)
+            else:
+                def dump():
+                    out = _CountingWriter()
+                    emitter.dump(data, out)
+                    return out
+            seconds, output = _time(dump, repeat)
+            size = len(output) if isinstance(output, bytes) else output.size
+            row[name] = {"seconds": seconds, "bytes": size, "speedup": baseline / seconds if seconds else None}
+        results.append(row)
+    return results
+
+
+class _CountingWriter:
+    """Текстовый приёмник, который только считает объём вывода в байтах."""
+
+    def __init__(self):
+        self.size = 0
+
+    def write(self, text):
+        self.size += len(text.encode("utf-8"))
+        return len(text)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Сравнение форматов вывода транслятора.")
+    arg_parser.add_argument("--scales", type=int, nargs="+", default=[1, 100, 1000],
+                            help="Сколько раз размножить input1–input4.")
+    arg_parser.add_argument("--repeat", type=int, default=3, help="Число повторов, берётся лучшее время.")
+    args = arg_parser.parse_args()
+    results = run(args.scales, args.repeat)
+    json.dump(results, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+import abc
+import json
+import struct
+from collections.abc import Mapping, Sequence
+
+import yaml
+
+# libyaml-версия дампера заметно быстрее; если её нет, используем чистый Python
+YAML_DUMPER = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
+
+class Emitter(abc.ABC):
+    """Интерфейс вывода результата трансляции."""
+    name = None
+    suffix = None
+    binary = False  # Нужен ли поток в двоичном режиме
+
+    @abc.abstractmethod
+    def dump(self, data, stream):
+        """Записывает data в открытый поток stream."""
+
+    def dump_to_path(self, data, path):
+        if self.binary:
+            with open(path, "wb") as f:
+                self.dump(data, f)
+        else:
+            with open(path, "w", encoding="utf-8") as f:
+                self.dump(data, f)
+
+
+class YamlEmitter(Emitter):
+    name = "yaml"
+    suffix = ".yaml"
+
+    def dump(self, data, stream):
+        yaml.dump(data, stream, Dumper=YAML_DUMPER, default_flow_style=False, allow_unicode=True)
+
+
+class JsonEmitter(Emitter):
+    name = "json"
+    suffix = ".json"
+
+    def dump(self, data, stream):
+        json.dump(data, stream, ensure_ascii=False, separators=(",", ":"))
+
+
+# Компактный двоичный формат.
+#
+# Файл: MAGIC, версия (u8), 3 байта выравнивания, затем корневое значение.
+# Значение начинается с байта-тега:
+#   T / F           true / false
+#   i <q>           целое, помещающееся в 64 бита
+#   I <I> bytes     длинное целое (знаковое, little-endian)
+#   f <d>           число с плавающей точкой
+#   s <I> bytes     строка UTF-8
+#   l <I> n*<I>     массив: число элементов и абсолютные смещения элементов
+#   m <I> n*<II>    таблица: пары абсолютных смещений (ключ, значение),
+#                   ключи отсортированы по байтам UTF-8
+# Смещения абсолютные, поэтому любой элемент читается прямо из отображённого
+# в память файла без разбора предшествующих данных. Они же служат обратными
+# ссылками: одинаковые строки и один и тот же объект массива или таблицы
+# (например, после хэш-консинга в ConfigParser) записываются один раз.
+BINARY_MAGIC = b"CFGB"
+BINARY_VERSION = 1
+_HEADER = struct.Struct("<4sB3x")
+_U32 = struct.Struct("<I")
+_I64 = struct.Struct("<q")
+_F64 = struct.Struct("<d")
+
+
+class BinaryEmitter(Emitter):
+    name = "binary"
+    suffix = ".cfgb"
+    binary = True
+
+    def dump(self, data, stream):
+        stream.write(self.encode(data))
+
+    def encode(self, data):
+        buffer = bytearray(_HEADER.pack(BINARY_MAGIC, BINARY_VERSION))
+        self._write(buffer, data, {}, {})
+        if len(buffer) > 0xFFFFFFFF:
+            raise ValueError("Результат не помещается в 32-битные смещения")
+        return bytes(buffer)
+
+    def _write(self, buffer, value, strings, containers):
+        """Дописывает значение в буфер и возвращает его смещение.
+
+        strings (строка -> смещение) и containers (id -> смещение) хранят уже
+        записанные значения, повторы становятся ссылками на них.
+        """
+        if isinstance(value, str):
+            offset = strings.get(value)
+            if offset is None:
+                offset = strings[value] = len(buffer)
+                raw = value.encode("utf-8")
+                buffer += b"s" + _U32.pack(len(raw)) + raw
+            return offset
+        if isinstance(value, (list, dict)):
+            offset = containers.get(id(value))
+            if offset is not None:
+                return offset
+            containers[id(value)] = len(buffer)
+        offset = len(buffer)
+        if value is True:
+            buffer += b"T"
+        elif value is False:
+            buffer += b"F"
+        elif isinstance(value, int):
+            if -(1 << 63) <= value < (1 << 63):
+                buffer += b"i" + _I64.pack(value)
+            else:
+                raw = value.to_bytes((value.bit_length() + 8) // 8, "little", signed=True)
+                buffer += b"I" + _U32.pack(len(raw)) + raw
+        elif isinstance(value, float):
+            buffer += b"f" + _F64.pack(value)
+        elif isinstance(value, list):
+            buffer += b"l" + _U32.pack(len(value))
+            table = len(buffer)
+            buffer += bytes(4 * len(value))
+            for i, item in enumerate(value):
+                _U32.pack_into(buffer, table + 4 * i, self._write(buffer, item, strings, containers))
+        elif isinstance(value, dict):
+            items = sorted(value.items(), key=lambda item: item[0].encode("utf-8"))
+            buffer += b"m" + _U32.pack(len(items))
+            table = len(buffer)
+            buffer += bytes(8 * len(items))
+            for i, (key, item) in enumerate(items):
+                _U32.pack_into(buffer, table + 8 * i, self._write(buffer, key, strings, containers))
+                _U32.pack_into(buffer, table + 8 * i + 4, self._write(buffer, item, strings, containers))
+        else:
+            raise TypeError(f"Неподдерживаемый тип значения: {type(value).__name__}")
+        return offset
+
+
+def load_binary(buffer):
+    """Возвращает корневое значение двоичного файла (bytes или mmap) без разбора.
+
+    Массивы и таблицы возвращаются ленивыми представлениями, которые читают
+    элементы по смещениям только при обращении к ним.
+    """
+    buffer = memoryview(buffer)
+    magic, version = _HEADER.unpack_from(buffer, 0)
+    if magic != BINARY_MAGIC or version != BINARY_VERSION:
+        raise ValueError("Неизвестный формат двоичного файла")
+    return _read(buffer, _HEADER.size)
+
+
+def _read(buffer, offset):
+    tag = buffer[offset]
+    if tag == 0x54:  # T
+        return True
+    if tag == 0x46:  # F
+        return False
+    if tag == 0x69:  # i
+        return _I64.unpack_from(buffer, offset + 1)[0]
+    if tag == 0x66:  # f
+        return _F64.unpack_from(buffer, offset + 1)[0]
+    if tag == 0x73:  # s
+        return str(_raw_string(buffer, offset), "utf-8")
+    if tag == 0x49:  # I
+        size = _U32.unpack_from(buffer, offset + 1)[0]
+        return int.from_bytes(buffer[offset + 5:offset + 5 + size], "little", signed=True)
+    if tag == 0x6C:  # l
+        return BinaryList(buffer, offset)
+    if tag == 0x6D:  # m
+        return BinaryTable(buffer, offset)
+    raise ValueError(f"Неизвестный тег {tag:#x} по смещению {offset}")
+
+
+def _raw_string(buffer, offset):
+    size = _U32.unpack_from(buffer, offset + 1)[0]
+    return buffer[offset + 5:offset + 5 + size]
+
+
+class BinaryList(Sequence):
+    """Ленивый массив из двоичного файла."""
+
+    def __init__(self, buffer, offset):
+        self._buffer = buffer
+        self._count = _U32.unpack_from(buffer, offset + 1)[0]
+        self._table = offset + 5
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._count))]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError(index)
+        return _read(self._buffer, _U32.unpack_from(self._buffer, self._table + 4 * index)[0])
+
+
+class BinaryTable(Mapping):
+    """Ленивая таблица из двоичного файла; поиск ключа — двоичный поиск."""
+
+    def __init__(self, buffer, offset):
+        self._buffer = buffer
+        self._count = _U32.unpack_from(buffer, offset + 1)[0]
+        self._table = offset + 5
+
+    def _entry(self, index):
+        return struct.unpack_from("<II", self._buffer, self._table + 8 * index)
+
+    def _key_bytes(self, index):
+        return bytes(_raw_string(self._buffer, self._entry(index)[0]))
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        for i in range(self._count):
+            yield self._key_bytes(i).decode("utf-8")
+
+    def __getitem__(self, key):
+        target = key.encode("utf-8")
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if self._key_bytes(middle) < target:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self._count and self._key_bytes(low) == target:
+            return _read(self._buffer, self._entry(low)[1])
+        raise KeyError(key)
+
+
+def to_python(value):
+    """Полностью раскрывает ленивое значение в обычные списки и словари."""
+    if isinstance(value, BinaryList):
+        return [to_python(item) for item in value]
+    if isinstance(value, BinaryTable):
+        return {key: to_python(item) for key, item in value.items()}
+    return value
+
+
+EMITTERS = {emitter.name: emitter for emitter in (YamlEmitter(), JsonEmitter(), BinaryEmitter())}
+
+
+def get_emitter(name):
+    try:
+        return EMITTERS[name]
+    except KeyError:
+        raise ValueError(f"Неизвестный формат вывода: {name}") from None
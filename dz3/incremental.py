@@ -0,0 +1,95 @@
+import os
+import json
+import hashlib
+
+from translator import ConfigParser, iter_tokens, map_file, split_definitions
+
+CACHE_VERSION = 1
+
+
+def load_cache(cache_path):
+    """Читает кэш разбора; при отсутствии или несовместимости возвращает пустой."""
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if cache.get("version") != CACHE_VERSION:
+        return {}
+    return cache.get("definitions", {})
+
+
+def save_cache(cache_path, definitions):
+    tmp_path = cache_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"version": CACHE_VERSION, "definitions": definitions}, f, ensure_ascii=False)
+    os.replace(tmp_path, cache_path)
+
+
+def _fingerprint(value):
+    """Представление значения для сравнения с учётом типа (1, 1.0 и true различаются)."""
+    return json.dumps(value, sort_keys=True, ensure_ascii=False)
+
+
+def _reject_tokens(text):
+    """SyntaxError, если в тексте вне определений есть хоть один токен."""
+    for token_type, _ in iter_tokens(text):
+        raise SyntaxError(f"Неожиданный токен: {token_type}")
+
+
+def translate_incremental(input_path, cache_path=None):
+    """Переводит файл, повторно разбирая только изменившиеся определения.
+
+    Для каждого определения верхнего уровня в кэше хранятся хэш его текста,
+    имена, прочитанные из контекста при разборе, и значение. Определение
+    разбирается заново, если изменился его текст или значение одного из
+    имён, от которых оно зависит, или если одно из этих имён ещё не определено
+    к этому месту файла. Возвращает пару (результат, статистика).
+    """
+    if cache_path is None:
+        cache_path = input_path + ".cache.json"
+    cached = load_cache(cache_path)
+    source = map_file(input_path)
+
+    result = {}
+    definitions = {}
+    occurrences = {}
+    changed = set()
+    context = {}
+    stats = {"reused": 0, "parsed": 0}
+    position = 0
+    for name, start, end in split_definitions(source):
+        if position == 0 and start > 0:
+            _reject_tokens(source[:start])
+        position = end
+        text = source[start:end]
+        digest = hashlib.sha1(text).hexdigest()
+        # Имя может определяться несколько раз: различаем вхождения по номеру
+        occurrence = occurrences.get(name, 0)
+        occurrences[name] = occurrence + 1
+        key = name if occurrence == 0 else f"{name}#{occurrence}"
+
+        entry = cached.get(key)
+        if (entry is not None and entry["hash"] == digest and changed.isdisjoint(entry["deps"])
+                and all(dep in context for dep in entry["deps"])):
+            value = entry["value"]
+            stats["reused"] += 1
+        else:
+            # keep пуст: в общий контекст значение кладётся ниже, одинаково для обеих веток
+            definition = ConfigParser(text, streaming=True, keep=frozenset())
+            definition.context = context
+            (_, value), = definition.iter_definitions()
+            entry_deps = sorted(definition.reads)
+            if entry is None or _fingerprint(entry["value"]) != _fingerprint(value):
+                changed.add(name)
+            entry = {"hash": digest, "deps": entry_deps, "value": value}
+            stats["parsed"] += 1
+        context[name] = value
+        result[name] = value
+        definitions[key] = entry
+    if not occurrences:
+        # Определений нет: весь вход должен состоять из пробелов и комментариев
+        _reject_tokens(source)
+
+    save_cache(cache_path, definitions)
+    return result, stats
@@ -0,0 +1,173 @@
+import unittest
+
+import io
+import os
+import tempfile
+
+import yaml
+
+from batch import translate_batch
+from emitters import EMITTERS, load_binary, to_python
+from incremental import translate_incremental
+from translator import ConfigParser, iter_tokens, map_file, referenced_names, translate_stream
+
+
+class TestConfigParser(unittest.TestCase):
+    def test_comments_skipped_in_single_pass(self):
+        tokens = list(iter_tokens("(* комментарий\n в две строки *) A := 1"))
+        self.assertEqual(tokens, [("NAME", "A"), ("ASSIGN", ":="), ("NUMBER", "1")])
+
+    def test_bytes_input(self):
+        tokens = list(iter_tokens('A := @"строка"'.encode("utf-8")))
+        self.assertEqual(tokens[-1], ("STRING", '@"строка"'))
+
+    def test_streaming_matches_list_mode(self):
+        for name in ["input1.txt", "input2.txt", "input3.txt", "input4.txt"]:
+            with open(name, "r", encoding="utf-8") as f:
+                expected = ConfigParser(f.read()).parse()
+            self.assertEqual(ConfigParser(map_file(name), streaming=True).parse(), expected)
+
+    def test_unexpected_end(self):
+        with self.assertRaises(SyntaxError):
+            ConfigParser("A := table([ B = 1", streaming=True).parse()
+
+    def test_referenced_names(self):
+        text = "A := 1 B := table([ X = A ]) C := !(B 2 +) D := 3"
+        self.assertEqual(referenced_names(text), {"A", "B"})
+
+    def test_translate_stream(self):
+        text = "A := 1 (* c *) B := {A, @\"x\"} C := !(A 2 +)"
+        out = io.StringIO()
+        translate_stream(text, out)
+        self.assertEqual(yaml.safe_load(out.getvalue()), {"A": 1, "B": [1, "x"], "C": 3})
+
+    def test_translate_stream_expression(self):
+        out = io.StringIO()
+        translate_stream("A := 7 B := !(A -2 +)", out)
+        self.assertEqual(yaml.safe_load(out.getvalue()), {"A": 7, "B": 5})
+
+    def test_translate_stream_redefinition(self):
+        out = io.StringIO()
+        with self.assertRaises(SyntaxError):
+            translate_stream("A := 1 A := 2", out)
+        self.assertEqual(yaml.safe_load(out.getvalue()), {"A": 1})
+        self.assertEqual(ConfigParser("A := 1 A := 2").parse(), {"A": 2})
+
+    def test_translate_stream_operators(self):
+        text = "A := 7 B := !(A 2 mod) C := !(1.5 A max) D := !(A 3 min) E := !(A 2 concat)"
+        out = io.StringIO()
+        translate_stream(text, out)
+        self.assertEqual(yaml.safe_load(out.getvalue()), ConfigParser(text).parse())
+        self.assertEqual(referenced_names(text), {"A"})
+
+    def test_expressions(self):
+        parser = ConfigParser("A := 7 B := !(A 2 mod) C := !(1.5 A max) D := !(A 2 concat) E := !(2 3 + A *)")
+        self.assertEqual(parser.parse(), {"A": 7, "B": 1, "C": 7, "D": "72", "E": 35})
+
+    def test_expression_memo_tracks_versions(self):
+        parser = ConfigParser("A := 1 B := !(A 1 +) A := 5 C := !(A 1 +)")
+        self.assertEqual(parser.parse(), {"A": 5, "B": 2, "C": 6})
+
+    def test_bad_expression(self):
+        with self.assertRaises(SyntaxError):
+            ConfigParser("A := !(1 +)").parse()
+        with self.assertRaises(SyntaxError):
+            ConfigParser("A := !(X 1 +)").parse()
+
+    def test_intern_shares_equal_values(self):
+        text = "A := table([ X = {1, 2}, Y = @\"s\" ]) B := table([ X = {1, 2}, Y = @\"s\" ]) C := {1.0, !(0.0 -1 *), 0.0}"
+        result = ConfigParser(text, intern=True).parse()
+        self.assertIs(result["A"], result["B"])
+        self.assertEqual(result, ConfigParser(text).parse())
+        self.assertIsNot(result["C"][1], result["C"][2])
+        self.assertIn("*id", yaml.safe_dump(result))
+
+
+class TestEmitters(unittest.TestCase):
+    def test_binary_round_trip(self):
+        data = {"B": [1, 2.5, True, "строка", 1 << 70], "A": {"X": [], "Y": -3}}
+        view = load_binary(EMITTERS["binary"].encode(data))
+        self.assertEqual(view["B"][3], "строка")
+        self.assertEqual(list(view), ["A", "B"])
+        self.assertEqual(to_python(view), data)
+
+    def test_binary_shares_repeats(self):
+        table = {"X": list(range(100)), "Y": "строка"}
+        shared = EMITTERS["binary"].encode({"A": table, "B": table})
+        copied = EMITTERS["binary"].encode({"A": table, "B": dict(table)})
+        self.assertLess(len(shared), len(copied))
+        self.assertEqual(to_python(load_binary(shared)), {"A": table, "B": table})
+
+    def test_json(self):
+        out = io.StringIO()
+        EMITTERS["json"].dump({"A": [1, "x"]}, out)
+        self.assertEqual(out.getvalue(), '{"A":[1,"x"]}')
+
+
+class TestIncremental(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "config.txt")
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def write(self, text):
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def test_only_changed_definitions_reparsed(self):
+        self.write("BASE := 10\nT := table([ A = !(BASE 2 *) ])\nL := {1, 2}\n")
+        result, stats = translate_incremental(self.path)
+        self.assertEqual(stats, {"reused": 0, "parsed": 3})
+        self.write("BASE := 11\nT := table([ A = !(BASE 2 *) ])\nL := {1, 2}\n")
+        result, stats = translate_incremental(self.path)
+        self.assertEqual(result, {"BASE": 11, "T": {"A": 22}, "L": [1, 2]})
+        self.assertEqual(stats, {"reused": 1, "parsed": 2})
+
+    def test_deleted_dependency(self):
+        self.write("A := 1\nB := {A}\n")
+        translate_incremental(self.path)
+        self.write("B := {A}\n")
+        with self.assertRaises(SyntaxError):
+            translate_incremental(self.path)
+
+    def test_reordered_dependency(self):
+        self.write("A := 1\nB := {A}\n")
+        translate_incremental(self.path)
+        self.write("B := {A}\nA := 1\n")
+        with self.assertRaises(SyntaxError):
+            translate_incremental(self.path)
+
+    def test_tokens_without_definitions(self):
+        self.write("123\n")
+        with self.assertRaises(SyntaxError):
+            translate_incremental(self.path)
+        self.assertFalse(os.path.exists(self.path + ".cache.json"))
+
+    def test_bool_int_change(self):
+        self.write("A := 1\nB := {A}\n")
+        translate_incremental(self.path)
+        self.write("A := true\nB := {A}\n")
+        result, _ = translate_incremental(self.path)
+        self.assertIs(result["B"][0], True)
+
+
+class TestBatch(unittest.TestCase):
+    def test_bad_file_does_not_abort_batch(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            good = os.path.join(tmp, "good.txt")
+            bad = os.path.join(tmp, "bad.txt")
+            with open(good, "w", encoding="utf-8") as f:
+                f.write("A := {1, 2}")
+            with open(bad, "w", encoding="utf-8") as f:
+                f.write("A := ?")
+            results = translate_batch([good, bad], "json", workers=2)
+            self.assertIsNone(results[0][2])
+            self.assertIsNotNone(results[1][2])
+            with open(os.path.join(tmp, "good.json"), encoding="utf-8") as f:
+                self.assertEqual(f.read().replace(" ", "").replace("\n", ""), '{"A":[1,2]}')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,80 +1,308 @@
+import io
 import re
 import sys
+import mmap
+import argparse
+import operator
+import functools
 import yaml
 
-class ConfigParser:
-    def __init__(self, input_text):
-        self.tokens = self.tokenize(input_text)
-        self.index = 0
-        self.context = {}  # Хранение ранее определенных переменных
+from emitters import YAML_DUMPER, EMITTERS, get_emitter
 
-    def tokenize(self, text):
-        text = re.sub(r"\(\*.*?\*\)", "", text, flags=re.DOTALL)
-        token_spec = [
-            ("NUMBER", r"\d+\.\d*|\d+"),
-            ("STRING", r'@"(.*?)"'),
-            ("NAME", r"[A-Z_]+"),
-            ("ASSIGN", r":="),
-            ("LBRACE", r"\{"),
-            ("RBRACE", r"\}"),
-            ("LBRACKET", r"\["),
-            ("RBRACKET", r"\]"),
-            ("EQUAL", r"="),
-            ("COMMA", r","),
-            ("TABLE", r"table"),
-            ("LPAREN", r"\("),
-            ("RPAREN", r"\)"),
-            ("EXPR", r"!\(([^)]+)\)"),
-            ("TRUE", r"true"),
-            ("FALSE", r"false"),
-            ("SKIP", r"[ \t\n]+"),
-            ("MISMATCH", r"."),
-        ]
-        token_regex = "|".join(f"(?P<{name}>{regex})" for name, regex in token_spec)
-        tokens = []
-        for match in re.finditer(token_regex, text):
+TOKEN_SPEC = [
+    ("COMMENT", r"(?s:\(\*.*?\*\))"),
+    ("NUMBER", r"\d+\.\d*|\d+"),
+    ("STRING", r'@"(.*?)"'),
+    ("NAME", r"[A-Z_]+"),
+    ("ASSIGN", r":="),
+    ("LBRACE", r"\{"),
+    ("RBRACE", r"\}"),
+    ("LBRACKET", r"\["),
+    ("RBRACKET", r"\]"),
+    ("EQUAL", r"="),
+    ("COMMA", r","),
+    ("TABLE", r"table"),
+    ("LPAREN", r"\("),
+    ("RPAREN", r"\)"),
+    ("EXPR", r"!\(([^)]+)\)"),
+    ("TRUE", r"true"),
+    ("FALSE", r"false"),
+    ("SKIP", r"[ \t\r\n]+"),
+    ("MISMATCH", r"."),
+]
+_TOKEN_PATTERN = "|".join(f"(?P<{name}>{regex})" for name, regex in TOKEN_SPEC)
+# Регулярные выражения компилируются один раз: для str и для байтов (mmap)
+TOKEN_RE = re.compile(_TOKEN_PATTERN)
+TOKEN_RE_BYTES = re.compile(_TOKEN_PATTERN.encode("utf-8"))
+_IGNORED = ("SKIP", "COMMENT")
+
+
+def iter_tokens(text):
+    """Лениво отдаёт токены (тип, значение) за один проход по тексту.
+
+    Принимает str или bytes-подобный объект (bytes, mmap); во втором случае
+    значения токенов декодируются из UTF-8 по одному.
+    """
+    if isinstance(text, str):
+        for match in TOKEN_RE.finditer(text):
             kind = match.lastgroup
+            if kind in _IGNORED:
+                continue
             value = match.group(kind)
-            if kind == "SKIP":
+            if kind == "MISMATCH":
+                raise SyntaxError(f"Нераспознанный токен: {value}")
+            yield kind, value
+    else:
+        for match in TOKEN_RE_BYTES.finditer(text):
+            kind = match.lastgroup
+            if kind in _IGNORED:
                 continue
-            elif kind == "MISMATCH":
+            value = match.group(kind).decode("utf-8", errors="replace")
+            if kind == "MISMATCH":
                 raise SyntaxError(f"Нераспознанный токен: {value}")
-            tokens.append((kind, value))
-        return tokens
+            yield kind, value
+
+
+def map_file(path):
+    """Отображает файл в память только для чтения (пустой файл — b"")."""
+    with open(path, "rb") as f:
+        try:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            return b""
+
+
+def _concat(a, b):
+    if isinstance(a, list) and isinstance(b, list):
+        return a + b
+    return f"{a}{b}"
+
+
+# Операторы постфиксных выражений !( ): все двуместные
+EXPR_OPERATORS = {
+    "+": operator.add,
+    "-": operator.sub,
+    "*": operator.mul,
+    "/": operator.truediv,
+    "mod": operator.mod,
+    "min": min,
+    "max": max,
+    "concat": _concat,
+}
+_EXPR_NUMBER = re.compile(r"-?(?:\d+\.\d*|\d+)")
+_EXPR_NAME = re.compile(r"[A-Z_]+")
+
+
+def iter_expression_tokens(expr):
+    """Разбивает тело !( ) на пары (вид, значение): NUMBER, OPERATOR или NAME.
+
+    Общий сканер для compile_expression и referenced_names, чтобы потоковый
+    поиск зависимостей не расходился с компилятором.
+    """
+    for token in expr.split():
+        if _EXPR_NUMBER.fullmatch(token):
+            yield "NUMBER", token
+        elif token in EXPR_OPERATORS:
+            yield "OPERATOR", token
+        elif _EXPR_NAME.fullmatch(token):
+            yield "NAME", token
+        else:
+            raise SyntaxError(f"Нераспознанный оператор или имя: {token}")
+
+
+class CompiledExpression:
+    """Скомпилированное выражение: используемые имена и функция от контекста."""
+    __slots__ = ("names", "evaluate")
+
+    def __init__(self, names, evaluate):
+        self.names = names
+        self.evaluate = evaluate
+
+
+def _number(token):
+    try:
+        return int(token)
+    except ValueError:
+        return float(token)
+
+
+def _const_node(value):
+    return True, value
+
+
+def _name_node(name):
+    def load(context):
+        try:
+            return context[name]
+        except KeyError:
+            raise SyntaxError(f"Нераспознанный оператор или имя: {name}") from None
+    return False, load
+
+
+def _binary_node(func, left, right):
+    """Собирает замыкание для операции; константные поддеревья сворачиваются."""
+    left_const, left_value = left
+    right_const, right_value = right
+    if left_const and right_const:
+        try:
+            return _const_node(func(left_value, right_value))
+        except Exception:
+            pass  # Ошибку (например, деление на ноль) покажем при вычислении
+    if left_const:
+        if right_const:
+            return False, lambda context: func(left_value, right_value)
+        return False, lambda context: func(left_value, right_value(context))
+    if right_const:
+        return False, lambda context: func(left_value(context), right_value)
+    return False, lambda context: func(left_value(context), right_value(context))
+
+
+@functools.lru_cache(maxsize=4096)
+def compile_expression(expr):
+    """Компилирует постфиксное выражение в замыкание; результат кэшируется по тексту."""
+    stack = []
+    names = []
+    for kind, token in iter_expression_tokens(expr):
+        if kind == "NUMBER":
+            stack.append(_const_node(_number(token)))
+        elif kind == "OPERATOR":
+            if len(stack) < 2:
+                raise SyntaxError("Некорректное выражение")
+            right = stack.pop()
+            left = stack.pop()
+            stack.append(_binary_node(EXPR_OPERATORS[token], left, right))
+        else:
+            names.append(token)
+            stack.append(_name_node(token))
+    if len(stack) != 1:
+        raise SyntaxError("Некорректное выражение")
+    is_const, value = stack[0]
+    evaluate = (lambda context: value) if is_const else value
+    return CompiledExpression(tuple(dict.fromkeys(names)), evaluate)
+
+
+def referenced_names(text):
+    """Возвращает множество имён, на которые есть ссылки в значениях или в !( ).
+
+    Имя считается ссылкой, если за ним не следует ':=' или '=' (то есть это не
+    определение и не ключ таблицы). Нужен только сканер, разбор не выполняется.
+    """
+    names = set()
+    pending = None  # Имя, про которое ещё неизвестно, ссылка ли это
+    for kind, value in iter_tokens(text):
+        if pending is not None and kind not in ("ASSIGN", "EQUAL"):
+            names.add(pending)
+        pending = value if kind == "NAME" else None
+        if kind == "EXPR":
+            names.update(word for kind, word in iter_expression_tokens(value[2:-1]) if kind == "NAME")
+    if pending is not None:
+        names.add(pending)
+    return names
+
+
+def _intern_key(value):
+    """Ключ элемента для хэш-консинга: контейнеры — по id, скаляры — по типу и значению."""
+    if isinstance(value, (list, dict)):
+        return id(value)
+    if isinstance(value, float):
+        return float, value.hex()  # Различает 0.0 и -0.0
+    return type(value), value
+
+
+class ConfigParser:
+    def __init__(self, input_text, streaming=False, keep=None, intern=False):
+        if streaming:
+            # Токены читаются по мере разбора, список целиком не строится
+            self._stream = iter_tokens(input_text)
+        else:
+            self.tokens = self.tokenize(input_text)
+            self._stream = iter(self.tokens)
+        self._current = next(self._stream, None)
+        self.context = {}  # Хранение ранее определенных переменных
+        self.keep = keep   # Какие имена сохранять в контексте (None — все)
+        self._versions = {}    # Номер версии каждого имени в контексте
+        self._expr_memo = {}   # (текст, версии имён) -> значение выражения
+        self.reads = set()     # Имена, прочитанные из контекста в текущем определении
+        # Хэш-консинг: структурно одинаковые значения разделяют один объект.
+        # Такие значения считаются неизменяемыми и не должны модифицироваться.
+        self._interned = {} if intern else None
+
+    def tokenize(self, text):
+        return list(iter_tokens(text))
+
+    def peek(self):
+        """Возвращает тип текущего токена или None в конце ввода."""
+        return self._current[0] if self._current is not None else None
+
+    def current(self):
+        if self._current is None:
+            raise SyntaxError("Неожиданный конец ввода")
+        return self._current
+
+    def advance(self):
+        self._current = next(self._stream, None)
 
     def parse(self):
-        result = {}
-        while self.index < len(self.tokens):
-            token_type, token_value = self.tokens[self.index]
+        return dict(self.iter_definitions())
+
+    def iter_definitions(self):
+        """Разбирает вход и отдаёт пары (имя, значение) по одному определению."""
+        while self.peek() is not None:
+            token_type, token_value = self.current()
             if token_type == "NAME":
                 name = self.parse_name()
-                if self.index < len(self.tokens) and self.tokens[self.index][0] == "ASSIGN":
+                if self.peek() == "ASSIGN":
                     self.expect("ASSIGN")
+                    self.reads = set()
                     value = self.parse_value()
-                    self.context[name] = value  # Сохраняем в контексте
-                    result[name] = value
+                    if self.keep is None or name in self.keep:
+                        self.define(name, value)
+                    yield name, value
                 else:
                     raise SyntaxError(f"Ожидался оператор присваивания ':=' после {name}")
             else:
                 raise SyntaxError(f"Неожиданный токен: {token_type}")
-        return result
+
+    def define(self, name, value):
+        """Сохраняет значение в контексте и увеличивает версию имени."""
+        self.context[name] = value
+        self._versions[name] = self._versions.get(name, 0) + 1
+
+    def intern(self, value):
+        """Возвращает ранее встреченное значение, структурно равное value.
+
+        Значения собираются снизу вверх, поэтому вложенные контейнеры уже
+        разделены и ключ строится по их id. Интернированный объект держит
+        вложенные живыми, так что id в ключах не переиспользуются.
+        """
+        if self._interned is None:
+            return value
+        if isinstance(value, list):
+            key = (list, tuple(map(_intern_key, value)))
+        elif isinstance(value, dict):
+            key = (dict, tuple((name, _intern_key(item)) for name, item in value.items()))
+        elif isinstance(value, str):
+            key = value
+        else:
+            return value
+        return self._interned.setdefault(key, value)
 
     def parse_value(self):
-        token_type, token_value = self.tokens[self.index]
+        token_type, token_value = self.current()
         if token_type == "STRING":
-            self.index += 1
-            return token_value[2:-1]
+            self.advance()
+            return self.intern(token_value[2:-1])
         elif token_type == "NUMBER":
-            self.index += 1
+            self.advance()
             try:
                 return int(token_value)
             except ValueError:
                 return float(token_value)
         elif token_type == "TRUE":
-            self.index += 1
+            self.advance()
             return True
         elif token_type == "FALSE":
-            self.index += 1
+            self.advance()
             return False
         elif token_type == "LBRACE":
             return self.parse_array()
@@ -83,7 +311,8 @@ class ConfigParser:
         elif token_type == "EXPR":
             return self.parse_expr()
         elif token_type == "NAME":
-            self.index += 1
+            self.advance()
+            self.reads.add(token_value)
             if token_value in self.context:
                 return self.context[token_value]
             else:
@@ -92,96 +321,160 @@ class ConfigParser:
             raise SyntaxError(f"Неизвестный тип токена: {token_type}")
 
     def parse_expr(self):
-        token_type, token_value = self.tokens[self.index]
+        token_type, token_value = self.current()
         if token_type != "EXPR":
             raise SyntaxError(f"Ожидался EXPR, найдено {token_type}")
         expr = token_value[2:-1]
-        result = self.evaluate_expression(expr)
-        self.index += 1
+        result = self.intern(self.evaluate_expression(expr))
+        self.advance()
         return result
 
     def evaluate_expression(self, expr):
-        tokens = expr.split()
-        stack = []
-        for token in tokens:
-            if token.isdigit():
-                stack.append(int(token))
-            elif token in self.context:
-                stack.append(self.context[token])
-            elif token == "+":
-                b = stack.pop()
-                a = stack.pop()
-                stack.append(a + b)
-            elif token == "-":
-                b = stack.pop()
-                a = stack.pop()
-                stack.append(a - b)
-            elif token == "*":
-                b = stack.pop()
-                a = stack.pop()
-                stack.append(a * b)
-            elif token == "/":
-                b = stack.pop()
-                a = stack.pop()
-                stack.append(a / b)
-            else:
-                raise SyntaxError(f"Нераспознанный оператор или имя: {token}")
-        if len(stack) != 1:
-            raise SyntaxError("Некорректное выражение")
-        return stack[0]
+        compiled = compile_expression(expr)
+        self.reads.update(compiled.names)
+        versions = self._versions
+        key = (expr, tuple(versions.get(name, 0) for name in compiled.names))
+        try:
+            return self._expr_memo[key]
+        except KeyError:
+            pass
+        result = self._expr_memo[key] = compiled.evaluate(self.context)
+        return result
 
     def parse_array(self):
         self.expect("LBRACE")
         array = []
-        while self.tokens[self.index][0] != "RBRACE":
+        while self.current()[0] != "RBRACE":
             value = self.parse_value()
             array.append(value)
-            if self.tokens[self.index][0] == "COMMA":
-                self.index += 1
+            if self.peek() == "COMMA":
+                self.advance()
         self.expect("RBRACE")
-        return array
+        return self.intern(array)
 
     def parse_table(self):
         self.expect("TABLE")
         self.expect("LPAREN")
         self.expect("LBRACKET")
         table = {}
-        while self.tokens[self.index][0] != "RBRACKET":
-            key = self.parse_name()
+        while self.current()[0] != "RBRACKET":
+            key = self.intern(self.parse_name())
             self.expect("EQUAL")
             value = self.parse_value()
             table[key] = value
-            if self.tokens[self.index][0] == "COMMA":
-                self.index += 1
+            if self.peek() == "COMMA":
+                self.advance()
         self.expect("RBRACKET")
         self.expect("RPAREN")
-        return table
+        return self.intern(table)
 
     def parse_name(self):
-        token_type, token_value = self.tokens[self.index]
+        token_type, token_value = self.current()
         if token_type != "NAME":
             raise SyntaxError(f"Ожидалось имя, найдено {token_type}")
-        self.index += 1
+        self.advance()
         return token_value
 
     def expect(self, token_type):
-        if self.tokens[self.index][0] != token_type:
-            raise SyntaxError(f"Ожидалось {token_type}, найдено {self.tokens[self.index][0]}")
-        self.index += 1
+        if self.current()[0] != token_type:
+            raise SyntaxError(f"Ожидалось {token_type}, найдено {self.current()[0]}")
+        self.advance()
+
+
+def split_definitions(text):
+    """Делит вход на определения верхнего уровня без разбора значений.
+
+    Отдаёт тройки (имя, начало, конец) — границы текста определения от имени
+    до начала следующего определения. Определение начинается с NAME, за
+    которым сразу (не считая пробелов и комментариев) следует ':='.
+    """
+    token_re = TOKEN_RE if isinstance(text, str) else TOKEN_RE_BYTES
+    current = None   # (имя, начало) открытого определения
+    pending = None   # Последний NAME, за которым может последовать ':='
+    for match in token_re.finditer(text):
+        kind = match.lastgroup
+        if kind in _IGNORED:
+            continue
+        if kind == "ASSIGN" and pending is not None:
+            if current is not None:
+                yield current[0], current[1], pending[1]
+            current = pending
+        if kind == "NAME":
+            name = match.group(kind)
+            pending = (name if isinstance(name, str) else name.decode("ascii"), match.start())
+        else:
+            pending = None
+    if current is not None:
+        yield current[0], current[1], len(text)
+
+
+def translate_stream(source, out, intern=False):
+    """Потоково переводит конфигурацию в YAML.
+
+    Каждое определение верхнего уровня записывается в out сразу после
+    разбора, общий словарь не строится. В контексте остаются только имена,
+    на которые есть ссылки. В отличие от parse() + safe_dump, определения
+    идут в порядке исходного файла, а повторно используемые значения
+    получают якоря YAML только в пределах одного определения. Повторное
+    определение имени — SyntaxError: уже записанный ключ нельзя заменить,
+    а два одинаковых ключа сделали бы документ YAML некорректным.
+    """
+    parser = ConfigParser(source, streaming=True, keep=referenced_names(source), intern=intern)
+    written = set()
+    for name, value in parser.iter_definitions():
+        if name in written:
+            raise SyntaxError(f"Повторное определение в потоковом режиме: {name}")
+        written.add(name)
+        out.write(yaml.dump({name: value}, Dumper=YAML_DUMPER, default_flow_style=False, allow_unicode=True))
 
 
 def main():
-    if len(sys.argv) != 2:
-        print("Использование: python3 parser.py <input_file>", file=sys.stderr)
-        sys.exit(1)
+    arg_parser = argparse.ArgumentParser(description="Транслятор конфигурационного языка в YAML.")
+    arg_parser.add_argument("input_file", help="Входной файл конфигурации.")
+    arg_parser.add_argument("--stream", action="store_true",
+                            help="Писать каждое определение сразу после разбора.")
+    arg_parser.add_argument("--incremental", action="store_true",
+                            help="Разбирать заново только изменившиеся определения.")
+    arg_parser.add_argument("--cache", help="Файл кэша для --incremental (по умолчанию <input>.cache.json).")
+    arg_parser.add_argument("-f", "--format", choices=sorted(EMITTERS), default="yaml",
+                            help="Формат вывода.")
+    arg_parser.add_argument("-o", "--output", help="Файл для вывода (по умолчанию stdout).")
+    arg_parser.add_argument("--intern", action="store_true",
+                            help="Разделять одинаковые массивы, таблицы и строки (якоря YAML, ссылки в binary).")
+    args = arg_parser.parse_args()
+    if args.stream and args.format != "yaml":
+        arg_parser.error("--stream поддерживается только для формата yaml")
+    if args.intern and args.incremental:
+        arg_parser.error("--intern не поддерживается вместе с --incremental")
 
     try:
-        with open(sys.argv[1], 'r') as file:
-            input_text = file.read()
-        parser = ConfigParser(input_text)
-        parsed_data = parser.parse()
-        yaml_output = yaml.safe_dump(parsed_data, default_flow_style=False, allow_unicode=True)
-        print(yaml_output)
+        if args.stream:
+            if args.output:
+                out = open(args.output, "w", encoding="utf-8", buffering=1024 * 1024)
+            else:
+                out = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8", write_through=False)
+            try:
+                translate_stream(map_file(args.input_file), out, args.intern)
+            finally:
+                if args.output:
+                    out.close()
+                else:
+                    out.detach()
+            return
+        if args.incremental:
+            from incremental import translate_incremental
+            parsed_data, _ = translate_incremental(args.input_file, args.cache)
+        else:
+            parser = ConfigParser(map_file(args.input_file), streaming=True, intern=args.intern)
+            parsed_data = parser.parse()
+        emitter = get_emitter(args.format)
+        if args.output:
+            emitter.dump_to_path(parsed_data, args.output)
+        elif emitter.binary:
+            emitter.dump(parsed_data, sys.stdout.buffer)
+        else:
+            emitter.dump(parsed_data, sys.stdout)
+            print()
     except Exception as e:
         print(f"Ошибка: {e}", file=sys.stderr)
         sys.exit(1)
@@ -1,4 +1,5 @@
 import json
+import mmap
 import struct
 import sys
 
@@ -15,30 +16,74 @@ COMMANDS = {
 
 }
 
-def pack_instruction(opcode, fields, data):
-    bitstring = [0] * 72
+INSTRUCTION_BITS = 72   # Длина команды в битах
+INSTRUCTION_SIZE = 9    # Длина команды в байтах
+OPCODE_BITS = 6
 
-    # Устанавливаем опкод (6 бит)
-    for i in range(6):
-        bitstring[i] = (opcode >> (5 - i)) & 1
 
-    # Устанавливаем поля
+def field_layout(fields):
+    """Переводит диапазоны битов полей (нумерация от старшего бита) в сдвиги и маски."""
+    layout = []
     for name, (start, end) in fields.items():
+        width = end - start + 1
+        layout.append((name, INSTRUCTION_BITS - 1 - end, (1 << width) - 1, start, end))
+    return layout
+
+
+# Раскладка каждой команды вычисляется один раз: (опкод, сдвиги и маски полей)
+LAYOUTS = {name: (spec["opcode"], field_layout(spec["fields"])) for name, spec in COMMANDS.items()}
+
+
+def encode_word(opcode, layout, data):
+    """Собирает команду в одно 72-битное целое сдвигами и масками."""
+    word = opcode << (INSTRUCTION_BITS - OPCODE_BITS)
+    for name, shift, mask, start, end in layout:
         value = data.get(name, 0)
-        bit_length = end - start + 1
-        max_value = (1 << bit_length) - 1
 
         # Проверка диапазона
-        if value < 0 or value > max_value:
-            raise ValueError(f"Value for field '{name}' ({value}) exceeds allowed range: 0-{max_value} (bit range: {start}-{end})")
+        if value < 0 or value > mask:
+            raise ValueError(f"Value for field '{name}' ({value}) exceeds allowed range: 0-{mask} (bit range: {start}-{end})")
+
+        # Поле целиком заменяет биты, попавшие в его диапазон (в том числе биты опкода)
+        word = (word & ~(mask << shift)) | (value << shift)
+    return word
 
-        # Заполняем битстроку значением
-        for i in range(bit_length):
-            bitstring[start + i] = (value >> (bit_length - i - 1)) & 1
 
-    # Преобразуем битстроку в строку и затем в байты
-    bitstring_str = "".join(map(str, bitstring))
-    return int(bitstring_str, 2).to_bytes(9, byteorder="big")
+def pack_instruction(opcode, fields, data):
+    return encode_word(opcode, field_layout(fields), data).to_bytes(INSTRUCTION_SIZE, byteorder="big")
+
+
+def parse_line(line):
+    """Разбирает строку исходника в (команда, поля) или None для пустых строк и комментариев."""
+    line = line.strip()
+    if not line or line.startswith("#"):
+        return None
+    parts = line.split()
+    command = parts[0].upper()
+    args = list(map(int, parts[1:]))
+    if command not in COMMANDS:
+        raise ValueError(f"Unknown command: {command}")
+    data = {"A": args[0], "B": args[1], "C": args[2]}
+    if "D" in COMMANDS[command]["fields"]:
+        data["D"] = args[3]
+    return command, data
+
+
+def encode_program(lines):
+    """Кодирует всю программу сразу в bytearray по заранее вычисленным раскладкам."""
+    layouts = LAYOUTS
+    words = []
+    for line in lines:
+        parsed = parse_line(line)
+        if parsed is None:
+            continue
+        command, data = parsed
+        opcode, layout = layouts[command]
+        words.append(encode_word(opcode, layout, data))
+    program = bytearray(INSTRUCTION_SIZE * len(words))
+    for i, word in enumerate(words):
+        program[i * INSTRUCTION_SIZE:(i + 1) * INSTRUCTION_SIZE] = word.to_bytes(INSTRUCTION_SIZE, "big")
+    return program
 
 
 
@@ -48,20 +93,12 @@ def assemble(source_path, binary_path, log_path):
     log = []
     with open(source_path, "r") as file:
         for line in file:
-            line = line.strip()
-            if not line or line.startswith("#"):
+            parsed = parse_line(line)
+            if parsed is None:
                 continue
-            parts = line.split()
-            command = parts[0].upper()
-            args = list(map(int, parts[1:]))
-            if command not in COMMANDS:
-                raise ValueError(f"Unknown command: {command}")
-            opcode = COMMANDS[command]["opcode"]
-            fields = COMMANDS[command]["fields"]
-            data = {"A": args[0], "B": args[1], "C": args[2]}
-            if "D" in fields:
-                data["D"] = args[3]
-            instruction = pack_instruction(opcode, fields, data)
+            command, data = parsed
+            opcode, layout = LAYOUTS[command]
+            instruction = encode_word(opcode, layout, data).to_bytes(INSTRUCTION_SIZE, "big")
             instructions.append(instruction)
             log.append({
                 "command": command,
@@ -73,6 +110,85 @@ def assemble(source_path, binary_path, log_path):
     with open(log_path, "w") as log_file:
         json.dump(log, log_file, indent=4, ensure_ascii=False)
 
+
+LOG_FORMATS = ("jsonl", "binary", "none")
+_LINE_NUMBER = struct.Struct("<I")  # Запись двоичного лога: номер строки исходника
+
+
+def count_lines(path, chunk_size=1 << 20):
+    """Быстро считает строки файла, читая его блоками байтов.
+
+    Концы строк считаются так же, как их делит текстовый режим: \n, \r и
+    \r\n (в том числе \r\n на границе блоков).
+    """
+    count = 0
+    last = b"\n"
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            count += chunk.count(b"\n") + chunk.count(b"\r") - chunk.count(b"\r\n")
+            if last == b"\r" and chunk[:1] == b"\n":
+                count -= 1
+            last = chunk[-1:]
+    return count + (last not in (b"\n", b"\r"))
+
+
+def _open_log(log_path, log_format):
+    if log_format not in LOG_FORMATS:
+        raise ValueError(f"Unknown log format: {log_format}")
+    if log_path is None or log_format == "none":
+        return None
+    return open(log_path, "wb" if log_format == "binary" else "w")
+
+
+def assemble_stream(source_path, binary_path, log_path=None, log_format="jsonl"):
+    """Потоковый двухпроходный ассемблер с постоянным расходом памяти.
+
+    Первый проход считает строки исходника и заранее выделяет program.bin
+    нужного размера, второй пишет команды прямо в отображённый в память
+    файл. Лог необязателен: JSON Lines (по записи на команду) или двоичный
+    файл с номером строки исходника для каждой команды. Возвращает число
+    записанных команд.
+    """
+    capacity = count_lines(source_path) * INSTRUCTION_SIZE
+    log = _open_log(log_path, log_format)
+    count = 0
+    try:
+        with open(source_path, "r") as source, open(binary_path, "w+b") as binary_file:
+            binary_file.truncate(capacity)
+            output = mmap.mmap(binary_file.fileno(), capacity) if capacity else None
+            try:
+                for line_number, line in enumerate(source, 1):
+                    try:
+                        parsed = parse_line(line)
+                        if parsed is None:
+                            continue
+                        command, data = parsed
+                        opcode, layout = LAYOUTS[command]
+                        word = encode_word(opcode, layout, data)
+                    except (ValueError, IndexError) as e:
+                        raise ValueError(f"{source_path}:{line_number}: {e}") from e
+                    position = count * INSTRUCTION_SIZE
+                    output[position:position + INSTRUCTION_SIZE] = word.to_bytes(INSTRUCTION_SIZE, "big")
+                    count += 1
+                    if log_format == "binary" and log is not None:
+                        log.write(_LINE_NUMBER.pack(line_number))
+                    elif log is not None:
+                        log.write(json.dumps({"line": line_number, "command": command, "fields": data,
+                                              "binary": output[position:position + INSTRUCTION_SIZE].hex()}))
+                        log.write("\n")
+            finally:
+                if output is not None:
+                    output.flush()
+                    output.close()
+                # Отрезаем место под пустые строки, комментарии и, при ошибке,
+                # под непрочитанный хвост: нулевые слова иначе читались бы как команды
+                binary_file.truncate(count * INSTRUCTION_SIZE)
+    finally:
+        if log is not None:
+            log.close()
+    return count
+
+
 #ИНТЕРПРЕТАТОР
 
 def extract_bits(bits, start, end):
@@ -164,18 +280,36 @@ def interpret(binary_path, memory_range, result_path):
 
 
 if __name__ == "__main__":
-    import sys
-    source = "program.txt"
-    binary = "program.bin"
-    log = "program_log.json"
-    result = "result.json"
+    import argparse
+    parser = argparse.ArgumentParser(description="Ассемблер и интерпретатор учебной ВМ.")
+    parser.add_argument("--source", default="program.txt", help="Исходный текст программы.")
+    parser.add_argument("--binary", default="program.bin", help="Двоичный файл программы.")
+    parser.add_argument("--log", default="program_log.json", help="Файл лога ассемблирования.")
+    parser.add_argument("--result", default="result.json", help="Файл результата интерпретации.")
+    parser.add_argument("--stream", action="store_true",
+                        help="Потоковое ассемблирование через mmap с компактным логом.")
+    parser.add_argument("--log-format", choices=LOG_FORMATS, default="jsonl",
+                        help="Формат лога для --stream.")
+    parser.add_argument("--container",
+                        help="Также записать контейнер программы (с таблицей строк при --log-format binary).")
+    args = parser.parse_args()
+    source = args.source
+    binary = args.binary
+    log = args.log
+    result = args.result
 
     # Ассемблирование
-    assemble(source, binary, log)
+    if args.stream:
+        assemble_stream(source, binary, log, args.log_format)
+    else:
+        assemble(source, binary, log)
+    if args.container:
+        from container import convert
+        lines = log if args.stream and args.log_format == "binary" else None
+        convert(binary, args.container, lines)
 
     # Интерпретация
     interpret(binary, memory_range=(0, 50), result_path=result)
 
-    print("Ассемблирование завершено. Лог в 'program_log.json'.")
-    print("Интерпретация завершена. Результат в 'result.json'.")
-
+    print(f"Ассемблирование завершено. Лог в '{log}'.")
+    print(f"Интерпретация завершена. Результат в '{result}'.")
@@ -0,0 +1,88 @@
+import sys
+import time
+import argparse
+
+from engine import load_program
+
+# Тип элемента NumPy для ширины ячейки: беззнаковые типы сами дают обрезку по модулю 2**width
+DTYPES = {8: "uint8", 16: "uint16", 32: "uint32", 64: "uint64"}
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError("Batch execution requires NumPy: pip install numpy") from None
+    return numpy
+
+
+def execute_batch(program, images, width=64):
+    """Выполняет одну программу над N образами памяти сразу.
+
+    images — массив формы (N, memory_size). Каждая команда применяется как
+    векторная операция сразу ко всем образам. Внутри используется
+    транспонированная копия (memory_size, N): тогда ячейка всех образов
+    лежит в памяти подряд. Возвращает новый массив формы (N, memory_size).
+    """
+    np = _numpy()
+    dtype = np.dtype(DTYPES[width])
+    mask = (1 << width) - 1
+    cells = np.array(np.asarray(images).T, dtype=dtype, order="C")
+    add = np.add
+    bitwise_or = np.bitwise_or
+    bitwise_xor = np.bitwise_xor
+    for opcode, b, c, d in zip(program.opcodes, program.b, program.c, program.d):
+        if opcode == 0:    # LOAD_CONST
+            cells[b] = c & mask
+        elif opcode == 1:  # LOAD_MEM
+            cells[b] = cells[c]
+        elif opcode == 2:  # STORE_MEM
+            add(cells[c], cells[d], out=cells[b])
+        elif opcode == 3:  # BITWISE_OR
+            bitwise_or(cells[c], cells[d], out=cells[b])
+        elif opcode == 4:  # ADD
+            add(cells[b], cells[c], out=cells[b])
+        elif opcode == 5:  # XOR
+            bitwise_xor(cells[b], cells[c], out=cells[b])
+        # Неизвестный опкод пропускается, как в interpret()
+    return cells.T
+
+
+def run_batch(binary_path, images, output_path=None, width=64):
+    """Декодирует program.bin (или контейнер) и выполняет его над всеми образами.
+
+    Если задан output_path, результат пишется прямо в файл .npy через
+    отображение в память, без промежуточного result.json на каждый образ.
+    """
+    np = _numpy()
+    images = np.asarray(images)
+    if images.ndim != 2:
+        raise ValueError(f"Expected a 2D array (N, memory_size), got shape {images.shape}")
+    program = load_program(binary_path, images.shape[1])
+    result = execute_batch(program, images, width)
+    if output_path is not None:
+        output = np.lib.format.open_memmap(output_path, mode="w+", dtype=result.dtype, shape=result.shape)
+        output[...] = result
+        output.flush()
+        return output
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Пакетное выполнение program.bin над множеством образов памяти.")
+    parser.add_argument("binary", help="Двоичный файл программы.")
+    parser.add_argument("inputs", help="Файл .npy с массивом формы (N, memory_size).")
+    parser.add_argument("output", help="Файл .npy для результирующих образов.")
+    parser.add_argument("--width", type=int, default=64, choices=sorted(DTYPES), help="Ширина ячейки в битах.")
+    args = parser.parse_args()
+
+    np = _numpy()
+    images = np.load(args.inputs, mmap_mode="r")
+    start = time.perf_counter()
+    result = run_batch(args.binary, images, args.output, args.width)
+    elapsed = time.perf_counter() - start
+    print(f"batch: {result.shape[0]} images x {result.shape[1]} cells in {elapsed * 1000:.2f} ms", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+import os
+import sys
+import mmap
+import zlib
+import struct
+import argparse
+from collections import namedtuple
+
+from assembler_inteprator import INSTRUCTION_SIZE
+from engine import MEMORY_SIZE, check_range, decode_program
+
+# Контейнер программы.
+#
+# Заголовок (little-endian): MAGIC, версия (u16), флаги (u16), число команд
+# (u32), CRC-32 команд (u32), гистограмма опкодов — 64 счётчика u32. Опкод
+# считается так же, как при разборе: старшие 6 бит команды. За заголовком
+# идут команды в том же виде, что в program.bin (по 9 байт, big-endian), а
+# при флаге FLAG_LINES — таблица номеров строк исходника, по u32 на команду
+# (как двоичный лог assemble_stream). Команда с номером i лежит по смещению
+# HEADER.size + 9 * i, поэтому к любой команде можно перейти за O(1).
+CONTAINER_MAGIC = b"DZ4P"
+CONTAINER_VERSION = 1
+FLAG_LINES = 0x1
+OPCODE_COUNT = 64
+HEADER = struct.Struct(f"<4sHHII{OPCODE_COUNT}I")
+_LINE = struct.Struct("<I")
+# Байт команды -> опкод: старшие 6 бит первого байта
+_OPCODE_TABLE = bytes(byte >> 2 for byte in range(256))
+
+# Команда, разобранная по индексу; line — строка исходника или None
+Instruction = namedtuple("Instruction", ["index", "opcode", "a", "b", "c", "d", "line"])
+
+
+def opcode_histogram(data):
+    """Число команд каждого опкода; считается срезами байтов без разбора команд."""
+    opcodes = bytes(data[0::INSTRUCTION_SIZE]).translate(_OPCODE_TABLE)
+    return [opcodes.count(opcode) for opcode in range(OPCODE_COUNT)]
+
+
+def pack_header(data, has_lines=False):
+    """Заголовок контейнера для команд data (bytes, memoryview или mmap)."""
+    if len(data) % INSTRUCTION_SIZE:
+        raise ValueError(f"Program size {len(data)} is not a multiple of {INSTRUCTION_SIZE}")
+    count = len(data) // INSTRUCTION_SIZE
+    flags = FLAG_LINES if has_lines else 0
+    return HEADER.pack(CONTAINER_MAGIC, CONTAINER_VERSION, flags, count, zlib.crc32(data),
+                       *opcode_histogram(data))
+
+
+def write_container(path, data, lines=None):
+    """Записывает команды data и необязательные номера строк в контейнер.
+
+    lines — последовательность номеров строк или уже упакованные u32 (bytes).
+    """
+    if lines is not None and not isinstance(lines, (bytes, bytearray, memoryview, mmap.mmap)):
+        lines = b"".join(_LINE.pack(line) for line in lines)
+    count = len(data) // INSTRUCTION_SIZE
+    if lines is not None and len(lines) != count * _LINE.size:
+        raise ValueError(f"Line table has {len(lines) // _LINE.size} entries, expected {count}")
+    with open(path, "wb") as f:
+        f.write(pack_header(data, lines is not None))
+        f.write(data)
+        if lines is not None:
+            f.write(lines)
+
+
+def _map(path):
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b""
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def convert(binary_path, container_path, lines_path=None):
+    """Переводит program.bin (и двоичный лог строк) в контейнер; возвращает число команд."""
+    data = _map(binary_path)
+    lines = _map(lines_path) if lines_path else None
+    try:
+        write_container(container_path, data, lines)
+        return len(data) // INSTRUCTION_SIZE
+    finally:
+        for mapped in (data, lines):
+            if isinstance(mapped, mmap.mmap):
+                mapped.close()
+
+
+def is_container(path):
+    with open(path, "rb") as f:
+        return f.read(len(CONTAINER_MAGIC)) == CONTAINER_MAGIC
+
+
+class ProgramContainer:
+    """Контейнер, отображённый в память; команды разбираются по индексу при обращении.
+
+    При открытии читается только заголовок. verify() проверяет размер,
+    контрольную сумму и гистограмму, не создавая объектов на каждую команду.
+    """
+
+    def __init__(self, path, memory_size=MEMORY_SIZE):
+        self.path = path
+        self.memory_size = memory_size
+        self._map = _map(path)
+        self._view = memoryview(self._map)
+        if len(self._view) < HEADER.size:
+            self.close()
+            raise ValueError(f"{path}: file is too short for a program container")
+        magic, self.version, self.flags, self.count, self.checksum, *histogram = HEADER.unpack_from(self._view)
+        if magic != CONTAINER_MAGIC or self.version != CONTAINER_VERSION:
+            self.close()
+            raise ValueError(f"{path}: unknown program container format")
+        self.histogram = histogram
+        if len(self._view) != self.expected_size:
+            size = len(self._view)
+            self.close()
+            raise ValueError(f"{path}: size {size} does not match header ({self.expected_size})")
+        end = HEADER.size + self.count * INSTRUCTION_SIZE
+        self.instructions = self._view[HEADER.size:end]
+        self.lines = self._view[end:end + self.count * _LINE.size] if self.has_lines else None
+
+    @property
+    def has_lines(self):
+        return bool(self.flags & FLAG_LINES)
+
+    @property
+    def expected_size(self):
+        """Размер файла по заголовку: заголовок, команды и таблица строк."""
+        return HEADER.size + self.count * (INSTRUCTION_SIZE + (_LINE.size if self.has_lines else 0))
+
+    def __len__(self):
+        return self.count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def word(self, index):
+        """Команда index как 72-битное целое."""
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError(index)
+        offset = index * INSTRUCTION_SIZE
+        return int.from_bytes(self.instructions[offset:offset + INSTRUCTION_SIZE], "big")
+
+    def line(self, index):
+        """Номер строки исходника для команды index или None, если таблицы строк нет."""
+        if self.lines is None:
+            return None
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError(index)
+        return _LINE.unpack_from(self.lines, index * _LINE.size)[0]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self.count))]
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError(index)
+        program = self.decode(index, index + 1)
+        return Instruction(index, program.opcodes[0], program.a[0], program.b[0], program.c[0],
+                           program.d[0], self.line(index))
+
+    def decode(self, start=0, stop=None):
+        """Разбирает команды [start, stop) в DecodedProgram, не трогая остальные.
+
+        Отрицательные границы не поддерживаются (как и для program.bin в load_program).
+        """
+        check_range(start, stop)
+        stop = self.count if stop is None else min(stop, self.count)
+        start = max(0, min(start, stop))
+        return decode_program(self.instructions[start * INSTRUCTION_SIZE:stop * INSTRUCTION_SIZE],
+                              self.memory_size)
+
+    def verify(self):
+        """Проверяет размер файла, CRC-32 и гистограмму опкодов; при ошибке — ValueError."""
+        if len(self._view) != self.expected_size:
+            raise ValueError(f"{self.path}: size {len(self._view)} does not match header ({self.expected_size})")
+        if zlib.crc32(self.instructions) != self.checksum:
+            raise ValueError(f"{self.path}: checksum mismatch")
+        if opcode_histogram(self.instructions) != self.histogram:
+            raise ValueError(f"{self.path}: opcode histogram mismatch")
+
+    def close(self):
+        for name in ("instructions", "lines", "_view"):
+            view = getattr(self, name, None)
+            if isinstance(view, memoryview):
+                view.release()
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+
+
+def read_instructions(path):
+    """Байты команд из program.bin или из контейнера (с проверкой контейнера)."""
+    if not is_container(path):
+        with open(path, "rb") as f:
+            return f.read()
+    with ProgramContainer(path) as program:
+        program.verify()
+        return bytes(program.instructions)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Контейнер программы: сборка, проверка и дизассемблирование.")
+    parser.add_argument("container", help="Файл контейнера.")
+    parser.add_argument("--from-bin", help="Собрать контейнер из program.bin.")
+    parser.add_argument("--lines", help="Двоичный лог строк assemble_stream для таблицы строк.")
+    parser.add_argument("--verify", action="store_true", help="Проверить контрольную сумму и гистограмму.")
+    parser.add_argument("--range", help="Дизассемблировать команды START:STOP.")
+    parser.add_argument("--memory-size", type=int, default=MEMORY_SIZE,
+                        help="Размер памяти для приведения адресов, как в engine.")
+    args = parser.parse_args()
+
+    if args.from_bin:
+        count = convert(args.from_bin, args.container, args.lines)
+        print(f"{args.container}: {count} instructions", file=sys.stderr)
+    with ProgramContainer(args.container, args.memory_size) as program:
+        if args.verify:
+            try:
+                program.verify()
+            except ValueError as e:
+                print(e, file=sys.stderr)
+                sys.exit(1)
+            print(f"{args.container}: OK, {len(program)} instructions, "
+                  f"opcodes {dict((op, n) for op, n in enumerate(program.histogram) if n)}", file=sys.stderr)
+        if args.range:
+            start, stop = (int(part) if part else None for part in args.range.split(":"))
+            for instruction in program[slice(start, stop)]:
+                line = f"  ; line {instruction.line}" if instruction.line is not None else ""
+                print(f"{instruction.index}: op={instruction.opcode} A={instruction.a} B={instruction.b} "
+                      f"C={instruction.c} D={instruction.d}{line}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+import sys
+import json
+import time
+import argparse
+import contextlib
+from array import array
+
+from assembler_inteprator import INSTRUCTION_SIZE, interpret
+from memory import MAX_MEMORY_SIZE, MEMORY_SIZE, OVERFLOW_MODES, Memory
+from tracing import TRACE_FILES, TRACE_LEVELS, Profiler, open_tracer
+
+RESULT_CELLS = 256     # Сколько ячеек попадает в result.json
+
+
+class DecodedProgram:
+    """Программа, один раз разобранная в компактные массивы полей."""
+
+    def __init__(self, opcodes, a, b, c, d):
+        self.opcodes = opcodes
+        self.a = a
+        self.b = b
+        self.c = c
+        self.d = d
+
+    def __len__(self):
+        return len(self.opcodes)
+
+
+def decode_program(data, memory_size=MEMORY_SIZE):
+    """Разбирает содержимое program.bin в массивы opcode/A/B/C/D.
+
+    Поля извлекаются так же, как в interpret(): опкод — старшие 6 бит
+    команды, остальные поля — от 7-го бита, адреса берутся по модулю
+    размера памяти.
+    """
+    opcodes = array("B")
+    a_values = array("B")
+    b_values = array("L")
+    c_values = array("L")
+    d_values = array("L")
+    for offset in range(0, len(data), INSTRUCTION_SIZE):
+        word = int.from_bytes(data[offset:offset + INSTRUCTION_SIZE], "big")
+        opcode = word >> 66
+        opcodes.append(opcode)
+        a_values.append((word >> 60) & 0x3F)
+        b_values.append(((word >> 40) & 0xFFFFF) % memory_size)
+        c_values.append(((word >> 24) & 0xFFFF) % memory_size)
+        d_values.append(((word >> 4) & 0xFFFFF) % memory_size if opcode in (2, 3) else 0)
+    return DecodedProgram(opcodes, a_values, b_values, c_values, d_values)
+
+
+def check_range(start, stop):
+    """ValueError, если границы диапазона команд отрицательные."""
+    if start < 0 or (stop is not None and stop < 0):
+        raise ValueError(f"Instruction range must be non-negative, got {start}:{stop}")
+
+
+def load_program(binary_path, memory_size=MEMORY_SIZE, start=0, stop=None):
+    """Загружает program.bin или контейнер; start/stop задают диапазон команд.
+
+    Диапазон читается с нужного смещения, остальные команды не разбираются.
+    Контейнер, загружаемый целиком, проверяется по контрольной сумме.
+    """
+    from container import ProgramContainer, is_container  # container сам импортирует engine
+    check_range(start, stop)
+    if is_container(binary_path):
+        with ProgramContainer(binary_path, memory_size) as program:
+            if start == 0 and stop is None:
+                program.verify()
+            return program.decode(start, stop)
+    with open(binary_path, "rb") as f:
+        f.seek(start * INSTRUCTION_SIZE)
+        data = f.read() if stop is None else f.read(max(0, stop - start) * INSTRUCTION_SIZE)
+    return decode_program(data, memory_size)
+
+
+def _load_const(memory, b, c, d):
+    memory[b] = c
+
+
+def _load_mem(memory, b, c, d):
+    memory[b] = memory[c]
+
+
+def _store_mem(memory, b, c, d):
+    memory[b] = memory[c] + memory[d]
+
+
+def _bitwise_or(memory, b, c, d):
+    memory[b] = memory[c] | memory[d]
+
+
+def _add(memory, b, c, d):
+    memory[b] = memory[b] + memory[c]
+
+
+def _xor(memory, b, c, d):
+    memory[b] = memory[b] ^ memory[c]
+
+
+# Таблица обработчиков по опкоду; None — неизвестный опкод (команда пропускается, как в interpret())
+HANDLERS = [_load_const, _load_mem, _store_mem, _bitwise_or, _add, _xor] + [None] * 58
+
+
+def make_handlers(mask):
+    """Таблица обработчиков с обрезкой результата по маске ширины ячейки.
+
+    OR и XOR не могут выйти за ширину операндов, поэтому маска нужна только
+    там, где результат может вырасти.
+    """
+    if mask is None:
+        return HANDLERS
+
+    def load_const(memory, b, c, d):
+        memory[b] = c & mask
+
+    def store_mem(memory, b, c, d):
+        memory[b] = (memory[c] + memory[d]) & mask
+
+    def add(memory, b, c, d):
+        memory[b] = (memory[b] + memory[c]) & mask
+
+    return [load_const, _load_mem, store_mem, _bitwise_or, add, _xor] + [None] * 58
+
+
+def execute(program, memory=None, tracer=None, profiler=None):
+    """Выполняет разобранную программу и возвращает (память, статистика).
+
+    memory — объект Memory (по умолчанию новый, на MEMORY_SIZE ячеек) или
+    обычный список целых. Без трассировщика и профилировщика работает цикл
+    без каких-либо проверок и вызовов на каждом шаге, кроме самого обработчика.
+    """
+    if memory is None:
+        memory = Memory(MEMORY_SIZE)
+    if isinstance(memory, Memory):
+        data = memory.writable()
+        handlers = make_handlers(memory.mask)
+    else:
+        data = memory
+        handlers = HANDLERS
+    skipped = 0
+    start = time.perf_counter()
+    if tracer is None and profiler is None:
+        for opcode, b, c, d in zip(program.opcodes, program.b, program.c, program.d):
+            handler = handlers[opcode]
+            if handler is None:
+                skipped += 1
+                continue
+            handler(data, b, c, d)
+    else:
+        skipped = _execute_observed(program, data, handlers, tracer, profiler)
+    elapsed = time.perf_counter() - start
+    stats = {
+        "instructions": len(program),
+        "skipped": skipped,
+        "seconds": elapsed,
+        "ips": len(program) / elapsed if elapsed else 0.0,
+    }
+    return memory, stats
+
+
+def _execute_observed(program, memory, handlers, tracer, profiler):
+    """Медленный цикл с вызовом трассировщика и профилировщика."""
+    clock = time.perf_counter
+    skipped = 0
+    for pc, (opcode, a, b, c, d) in enumerate(zip(program.opcodes, program.a, program.b,
+                                                  program.c, program.d)):
+        handler = handlers[opcode]
+        if handler is None:
+            skipped += 1
+            continue
+        old = memory[b]
+        if profiler is not None:
+            step_start = clock()
+            handler(memory, b, c, d)
+            profiler.record(opcode, b, c, d, clock() - step_start)
+        else:
+            handler(memory, b, c, d)
+        if tracer is not None and tracer.wants(pc):
+            new = memory[b]
+            tracer.record(pc, opcode, a, b, c, d, [(b, new)] if new != old else [])
+    return skipped
+
+
+def write_result(memory, result_path, start=0, stop=RESULT_CELLS):
+    """Пишет диапазон памяти в JSON в том же виде, что и interpret().
+
+    Значения берутся из среза без копирования всей памяти и пишутся по одному.
+    """
+    cells = memory.view(start, stop) if isinstance(memory, Memory) else memory[start:stop]
+    values = iter(cells)
+    with open(result_path, "w") as f:
+        first = next(values, None)
+        if first is None:
+            f.write('{\n    "memory": []\n}')
+            return
+        f.write('{\n    "memory": [\n        ' + str(first))
+        for value in values:
+            f.write(",\n        ")
+            f.write(str(value))
+        f.write("\n    ]\n}")
+
+
+def run(binary_path, result_path, tracer=None, profiler=None, memory=None, dump_range=(0, RESULT_CELLS),
+        instruction_range=(0, None)):
+    memory = memory if memory is not None else Memory(MEMORY_SIZE)
+    program = load_program(binary_path, len(memory), *instruction_range)
+    memory, stats = execute(program, memory, tracer=tracer, profiler=profiler)
+    write_result(memory, result_path, *dump_range)
+    return stats
+
+
+def measure_reference(binary_path, result_path):
+    """Время работы исходного interpret() на той же программе (его вывод подавляется)."""
+    with open(binary_path, "rb") as f:
+        count = (len(f.read()) + INSTRUCTION_SIZE - 1) // INSTRUCTION_SIZE
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(None):
+        interpret(binary_path, memory_range=(0, 50), result_path=result_path)
+    elapsed = time.perf_counter() - start
+    return {"instructions": count, "seconds": elapsed, "ips": count / elapsed if elapsed else 0.0}
+
+
+def _positive_int(value):
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"expected an integer >= 1, got {value}")
+    return number
+
+
+def _span(value, open_ended=True):
+    """Разбирает диапазон START:STOP; при open_ended границы можно опускать."""
+    parts = value.split(":")
+    if len(parts) != 2:
+        raise argparse.ArgumentTypeError(f"expected START:STOP, got {value}")
+    try:
+        start, stop = (int(part) if part or not open_ended else None for part in parts)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected integer bounds in START:STOP, got {value}") from None
+    if (start is not None and start < 0) or (stop is not None and stop < 0):
+        raise argparse.ArgumentTypeError(f"expected non-negative bounds, got {value}")
+    return start, stop
+
+
+def _cell_span(value):
+    return _span(value, open_ended=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Быстрый интерпретатор program.bin.")
+    parser.add_argument("binary", nargs="?", default="program.bin", help="Двоичный файл программы.")
+    parser.add_argument("result", nargs="?", default="result.json", help="Файл результата.")
+    parser.add_argument("--trace-level", choices=TRACE_LEVELS, default="off",
+                        help="Уровень трассировки: off, sampled (каждая N-я команда) или full.")
+    parser.add_argument("--trace-file",
+                        help="Файл трассы (по умолчанию trace.jsonl или trace.bin по формату).")
+    parser.add_argument("--trace-format", choices=sorted(TRACE_FILES), default="jsonl",
+                        help="Формат трассы.")
+    parser.add_argument("--sample-every", type=_positive_int, default=1000, help="Шаг выборки для sampled.")
+    parser.add_argument("--profile", action="store_true",
+                        help="Вывести сводку по опкодам и горячим адресам памяти.")
+    parser.add_argument("--memory-size", type=int, default=MEMORY_SIZE,
+                        help=f"Число ячеек памяти (до {MAX_MEMORY_SIZE}).")
+    parser.add_argument("--width", type=int, default=64, choices=[8, 16, 32, 64],
+                        help="Ширина ячейки в битах.")
+    parser.add_argument("--overflow", choices=OVERFLOW_MODES, default="wrap",
+                        help="Поведение при переполнении ячейки.")
+    parser.add_argument("--dump", type=_cell_span, default=f"0:{RESULT_CELLS}",
+                        help="Диапазон ячеек для result.json в виде START:STOP.")
+    parser.add_argument("--range", type=_span, default=":",
+                        help="Выполнить только команды START:STOP (program.bin или контейнер).")
+    parser.add_argument("--compare", action="store_true",
+                        help="Также запустить исходный interpret() и сравнить скорость.")
+    args = parser.parse_args()
+
+    tracer = open_tracer(args.trace_level, args.trace_file, args.trace_format, args.sample_every)
+    profiler = Profiler() if args.profile else None
+    try:
+        memory = Memory(args.memory_size, args.width, args.overflow)
+        range_start, range_stop = args.range
+        stats = run(args.binary, args.result, tracer=tracer, profiler=profiler,
+                    memory=memory, dump_range=args.dump,
+                    instruction_range=(range_start or 0, range_stop))
+    finally:
+        if tracer is not None:
+            tracer.close()
+    if profiler is not None:
+        json.dump(profiler.summary(), sys.stderr, indent=2)
+        print(file=sys.stderr)
+    print(f"engine: {stats['instructions']} instructions, {stats['ips']:.0f} instructions/s", file=sys.stderr)
+    if args.compare:
+        reference = measure_reference(args.binary, args.result + ".reference")
+        print(f"interpret: {reference['instructions']} instructions, {reference['ips']:.0f} instructions/s",
+              file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
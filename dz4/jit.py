@@ -0,0 +1,188 @@
+import os
+import sys
+import time
+import marshal
+import hashlib
+import argparse
+
+from container import read_instructions
+from engine import MEMORY_SIZE, RESULT_CELLS, _positive_int, decode_program, write_result
+from memory import OVERFLOW_MODES, Memory
+
+BLOCK_SIZE = 2000   # Команд в одной сгенерированной функции
+JIT_VERSION = 1     # Меняется при изменении генерируемого кода (сбрасывает дисковый кэш)
+
+_cache = {}         # Ключ программы -> CompiledProgram в пределах процесса
+
+
+class CompiledProgram:
+    """Программа, переведённая в функции Python; run(data) изменяет массив памяти."""
+
+    def __init__(self, run, stats):
+        self.run = run
+        self.stats = stats
+
+    def __call__(self, memory):
+        data = memory.writable() if isinstance(memory, Memory) else memory
+        self.run(data)
+        return memory
+
+
+def _optimize(program, mask):
+    """Свёртка констант и удаление мёртвых записей.
+
+    Возвращает список операторов (ячейка, выражение, прочитанные ячейки).
+    """
+    def operand(cell):
+        if cell in known:
+            return str(known[cell]), ()
+        return f"m[{cell}]", (cell,)
+
+    def binary(left, op, right, masked):
+        left_text, left_reads = operand(left)
+        right_text, right_reads = operand(right)
+        if not left_reads and not right_reads:
+            value = _FOLD[op](known[left], known[right])
+            return (value & mask if masked and mask is not None else value), None
+        text = f"{left_text} {op} {right_text}"
+        if masked and mask is not None:
+            text = f"({text}) & {mask}"
+        return text, set(left_reads) | set(right_reads)
+
+    known = {}       # Ячейки, значение которых известно на этапе компиляции
+    statements = []
+    folded = 0
+    for opcode, b, c, d in zip(program.opcodes, program.b, program.c, program.d):
+        if opcode == 0:    # LOAD_CONST
+            value, reads = (c & mask if mask is not None else c), None
+        elif opcode == 1:  # LOAD_MEM
+            if c in known:
+                value, reads = known[c], None
+            else:
+                value, reads = f"m[{c}]", {c}
+        elif opcode == 2:  # STORE_MEM
+            value, reads = binary(c, "+", d, True)
+        elif opcode == 3:  # BITWISE_OR
+            value, reads = binary(c, "|", d, False)
+        elif opcode == 4:  # ADD
+            value, reads = binary(b, "+", c, True)
+        elif opcode == 5:  # XOR
+            value, reads = binary(b, "^", c, False)
+        else:
+            continue       # Неизвестный опкод пропускается, как в interpret()
+        if reads is None:
+            if opcode != 0:
+                folded += 1
+            known[b] = value
+            statements.append((b, str(value), set()))
+        else:
+            known.pop(b, None)
+            statements.append((b, value, reads))
+
+    # Обратный проход: запись мертва, если ячейку перезапишут раньше, чем прочитают
+    live = []
+    overwritten = set()
+    for target, expr, reads in reversed(statements):
+        if target in overwritten:
+            continue
+        overwritten.add(target)
+        overwritten.difference_update(reads)
+        live.append((target, expr))
+    live.reverse()
+    stats = {"instructions": len(program), "folded": folded,
+             "eliminated": len(statements) - len(live), "statements": len(live)}
+    return live, stats
+
+
+_FOLD = {"+": lambda x, y: x + y, "|": lambda x, y: x | y, "^": lambda x, y: x ^ y}
+
+
+def generate_source(program, mask=None):
+    """Генерирует исходный код модуля с функцией run(m) и статистику оптимизации."""
+    statements, stats = _optimize(program, mask)
+    lines = []
+    blocks = []
+    for start in range(0, len(statements), BLOCK_SIZE):
+        name = f"_block_{len(blocks)}"
+        blocks.append(name)
+        lines.append(f"def {name}(m):")
+        lines.extend(f"    m[{target}] = {expr}" for target, expr in statements[start:start + BLOCK_SIZE])
+        lines.append("")
+    lines.append("def run(m):")
+    lines.extend(f"    {name}(m)" for name in blocks)
+    if not blocks:
+        lines.append("    pass")
+    return "\n".join(lines) + "\n", stats
+
+
+def program_key(data, memory_size, mask):
+    digest = hashlib.sha256(data).hexdigest()
+    return f"{digest}-{memory_size}-{mask}-{JIT_VERSION}-{sys.implementation.cache_tag}"
+
+
+def compile_binary(data, memory_size=MEMORY_SIZE, mask=None, cache_dir=None):
+    """Компилирует содержимое program.bin с кэшированием по хэшу программы.
+
+    Кэш в памяти процесса хранит готовые функции; cache_dir, если задан,
+    хранит байт-код (marshal), так что новый процесс не декодирует и не
+    оптимизирует программу повторно.
+    """
+    key = program_key(data, memory_size, mask)
+    compiled = _cache.get(key)
+    if compiled is not None:
+        return compiled
+    cache_path = os.path.join(cache_dir, key + ".jit") if cache_dir else None
+    code = stats = None
+    if cache_path and os.path.exists(cache_path):
+        with open(cache_path, "rb") as f:
+            stats, code = marshal.load(f), marshal.load(f)
+    if code is None:
+        source, stats = generate_source(decode_program(data, memory_size), mask)
+        code = compile(source, f"<jit {key[:12]}>", "exec")
+        if cache_path:
+            os.makedirs(cache_dir, exist_ok=True)
+            tmp_path = cache_path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                marshal.dump(stats, f)
+                marshal.dump(code, f)
+            os.replace(tmp_path, cache_path)
+    namespace = {}
+    exec(code, namespace)
+    compiled = _cache[key] = CompiledProgram(namespace["run"], stats)
+    return compiled
+
+
+def compile_file(binary_path, memory, cache_dir=None):
+    data = read_instructions(binary_path)
+    mask = memory.mask if isinstance(memory, Memory) else None
+    return compile_binary(data, len(memory), mask, cache_dir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Компиляция program.bin в функции Python и запуск.")
+    parser.add_argument("binary", nargs="?", default="program.bin", help="Двоичный файл программы.")
+    parser.add_argument("result", nargs="?", default="result.json", help="Файл результата.")
+    parser.add_argument("--memory-size", type=int, default=MEMORY_SIZE, help="Число ячеек памяти.")
+    parser.add_argument("--width", type=int, default=64, choices=[8, 16, 32, 64],
+                        help="Ширина ячейки в битах.")
+    parser.add_argument("--overflow", choices=OVERFLOW_MODES, default="wrap",
+                        help="Поведение при переполнении ячейки.")
+    parser.add_argument("--cache-dir", default=".jit_cache", help="Каталог дискового кэша.")
+    parser.add_argument("--runs", type=_positive_int, default=1, help="Сколько раз выполнить программу.")
+    args = parser.parse_args()
+
+    memory = Memory(args.memory_size, args.width, args.overflow)
+    start = time.perf_counter()
+    compiled = compile_file(args.binary, memory, args.cache_dir)
+    compile_time = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(args.runs):
+        result = compiled(memory.snapshot())
+    run_time = time.perf_counter() - start
+    write_result(result, args.result, 0, RESULT_CELLS)
+    print(f"jit: {compiled.stats}, compile {compile_time * 1000:.2f} ms, "
+          f"{args.runs} runs in {run_time * 1000:.2f} ms", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
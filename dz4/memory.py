@@ -0,0 +1,73 @@
+from array import array
+
+ADDRESS_BITS = 20                   # Ширина адресных полей B и D
+MAX_MEMORY_SIZE = 1 << ADDRESS_BITS
+MEMORY_SIZE = 1024                  # Размер памяти по умолчанию, как в interpret()
+OVERFLOW_MODES = ("wrap", "error")
+# Коды типов array для поддерживаемой ширины ячейки (без знака).
+# Размер "L" на LP64 равен 8 байтам, поэтому для 32 бит берём "I", если он 4-байтный.
+_TYPECODES = {8: "B", 16: "H", 32: "I" if array("I").itemsize == 4 else "L", 64: "Q"}
+
+
+class Memory:
+    """Память ВМ на типизированном массиве array вместо списка целых Python.
+
+    width — ширина ячейки в битах. overflow задаёт поведение при выходе
+    результата за ширину: "wrap" — обрезка по модулю 2**width, "error" —
+    OverflowError от самого массива. Снимки (snapshot) копируют данные
+    только при первой записи в одну из копий.
+    """
+
+    def __init__(self, size=MEMORY_SIZE, width=64, overflow="wrap", _data=None):
+        if not 0 < size <= MAX_MEMORY_SIZE:
+            raise ValueError(f"Memory size must be in 1..{MAX_MEMORY_SIZE}, got {size}")
+        if width not in _TYPECODES:
+            raise ValueError(f"Unsupported cell width: {width} (expected one of {sorted(_TYPECODES)})")
+        if overflow not in OVERFLOW_MODES:
+            raise ValueError(f"Unknown overflow mode: {overflow}")
+        typecode = _TYPECODES[width]
+        if array(typecode).itemsize * 8 != width:
+            raise ValueError(f"Platform has no {width}-bit array type")
+        self.size = size
+        self.width = width
+        self.overflow = overflow
+        self.mask = (1 << width) - 1 if overflow == "wrap" else None
+        self._data = _data if _data is not None else array(typecode, bytes(array(typecode).itemsize * size))
+        self._refs = [1]  # Сколько объектов Memory разделяют self._data
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, index):
+        return self._data[index]
+
+    def __setitem__(self, index, value):
+        if self.mask is not None:
+            value &= self.mask
+        self.writable()[index] = value
+
+    def writable(self):
+        """Возвращает массив для записи, копируя его, если он разделён со снимком."""
+        if self._refs[0] > 1:
+            self._refs[0] -= 1
+            self._data = array(self._data.typecode, self._data)
+            self._refs = [1]
+        return self._data
+
+    def snapshot(self):
+        """Дешёвый снимок: данные копируются при первой записи в любую из копий."""
+        copy = Memory.__new__(Memory)
+        copy.__dict__.update(self.__dict__)
+        self._refs[0] += 1
+        return copy
+
+    def view(self, start=0, stop=None):
+        """Срез памяти без копирования (memoryview поверх массива)."""
+        stop = self.size if stop is None else min(stop, self.size)
+        return memoryview(self._data)[start:stop]
+
+    def load(self, values, start=0):
+        """Записывает последовательность значений начиная с адреса start."""
+        data = self.writable()
+        for offset, value in enumerate(values):
+            data[start + offset] = value & self.mask if self.mask is not None else value
@@ -1,7 +1,23 @@
 import unittest
+import io
 import os
 import json
 import subprocess
+import contextlib
+from array import array
+
+import assembler_inteprator as asm
+import batch
+import container
+import engine
+import jit
+import tracing
+from memory import Memory
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 class TestAssemblerInterpreter(unittest.TestCase):
     def setUp(self):
@@ -96,5 +112,267 @@ class TestAssemblerInterpreter(unittest.TestCase):
         result = self.read_result()
         self.assertEqual(result["memory"][30], 5 + 7)
 
+class TestEncoder(unittest.TestCase):
+    def test_matches_reference_log(self):
+        """Кодировщик даёт те же байты, что записаны в program_log.json."""
+        with open("program_log.json", "r") as f:
+            expected = [entry["binary"] for entry in json.load(f)]
+        with open("program.txt", "r") as f:
+            program = asm.encode_program(f)
+        actual = [program[i:i + 9].hex() for i in range(0, len(program), 9)]
+        self.assertEqual(actual, expected)
+
+    def test_stream_matches_assemble(self):
+        asm.assemble_stream("program.txt", "test_program.bin", "test_program_log.jsonl")
+        with open("test_program.bin", "rb") as f, open("program.bin", "rb") as reference:
+            self.assertEqual(f.read(), reference.read())
+        with open("test_program_log.jsonl", "r") as f:
+            self.assertEqual(json.loads(f.readline())["line"], 1)
+        os.remove("test_program.bin")
+        os.remove("test_program_log.jsonl")
+
+    def test_stream_line_endings(self):
+        with open("program.txt", "r") as f:
+            lines = f.read().splitlines()
+        try:
+            for ending in ["\r", "\r\n", "\n"]:
+                with open("test_program.txt", "w", newline="") as f:
+                    f.write(ending.join(lines + ["", "# комментарий"]))
+                self.assertEqual(asm.count_lines("test_program.txt", chunk_size=7), len(lines) + 2)
+                asm.assemble_stream("test_program.txt", "test_program.bin")
+                with open("test_program.bin", "rb") as f, open("program.bin", "rb") as reference:
+                    self.assertEqual(f.read(), reference.read())
+        finally:
+            for name in ["test_program.txt", "test_program.bin"]:
+                if os.path.exists(name):
+                    os.remove(name)
+
+    def test_stream_error_has_line_number(self):
+        with open("test_program.txt", "w") as f:
+            f.write("LOAD_CONST 0 1 2\n\nFOO 0 1 2\n")
+        try:
+            with self.assertRaisesRegex(ValueError, ":3: Unknown command"):
+                asm.assemble_stream("test_program.txt", "test_program.bin")
+            self.assertEqual(os.path.getsize("test_program.bin"), asm.INSTRUCTION_SIZE)
+        finally:
+            for name in ["test_program.txt", "test_program.bin"]:
+                if os.path.exists(name):
+                    os.remove(name)
+
+    def test_field_range_checked(self):
+        with self.assertRaises(ValueError):
+            asm.encode_program(["LOAD_CONST 0 10 70000"])
+
+class TestEngine(unittest.TestCase):
+    def test_matches_interpret(self):
+        """Быстрый движок даёт ту же память, что и исходный interpret()."""
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            asm.interpret("program.bin", memory_range=(0, 50), result_path="test_result.json")
+        with open("test_result.json", "r") as f:
+            expected = json.load(f)["memory"]
+        os.remove("test_result.json")
+        memory, stats = engine.execute(engine.load_program("program.bin"))
+        self.assertEqual(list(memory.view(0, 256)), expected)
+        self.assertEqual(stats["instructions"], 10)
+
+    def test_tracer_and_profiler(self):
+        program = engine.decode_program(asm.encode_program(["LOAD_CONST 0 1 5", "LOAD_CONST 0 1 5"]))
+        stream = io.StringIO()
+        profiler = tracing.Profiler()
+        engine.execute(program, tracer=tracing.JsonlTracer(stream), profiler=profiler)
+        records = [json.loads(line) for line in stream.getvalue().splitlines()]
+        self.assertEqual(len(records), 2)
+        self.assertEqual(len(records[0]["changes"]), 1)
+        self.assertEqual(records[1]["changes"], [])  # Ячейка не изменилась
+        self.assertEqual(profiler.summary()["opcodes"]["LOAD_CONST"]["count"], 2)
+
+    def test_tracer_options(self):
+        with self.assertRaises(ValueError):
+            tracing.JsonlTracer(io.StringIO(), sample_every=0)
+        with self.assertRaises(TypeError):
+            tracing.Tracer(io.StringIO())
+        tracer = tracing.open_tracer("full", None, "binary")
+        try:
+            self.assertEqual(tracer.stream.name, "trace.bin")
+        finally:
+            tracer.close()
+            os.remove("trace.bin")
+        self.assertEqual(engine._positive_int("3"), 3)
+        with self.assertRaises(engine.argparse.ArgumentTypeError):
+            engine._positive_int("0")
+        self.assertEqual(engine._span("2:"), (2, None))
+        self.assertEqual(engine._cell_span("0:50"), (0, 50))
+        for parse, value in ((engine._span, "5"), (engine._cell_span, "5"), (engine._cell_span, ":3"),
+                             (engine._span, "-1:")):
+            with self.assertRaises(engine.argparse.ArgumentTypeError):
+                parse(value)
+
+def make_program(instructions):
+    """Собирает DecodedProgram из кортежей (opcode, B, C, D)."""
+    columns = list(zip(*instructions))
+    return engine.DecodedProgram(array("B", columns[0]), array("B", [0] * len(instructions)),
+                                 array("L", columns[1]), array("L", columns[2]), array("L", columns[3]))
+
+class TestMemory(unittest.TestCase):
+    def test_wraparound(self):
+        program = make_program([
+            (0, 1, 200, 0),  # m[1] = 200
+            (0, 2, 100, 0),  # m[2] = 100
+            (2, 3, 1, 2),    # m[3] = m[1] + m[2] = 300 — не помещается в 8 бит
+            (0, 4, 300, 0),  # m[4] = 300 — константа шире ячейки
+        ])
+        memory = Memory(16, width=8)
+        engine.execute(program, memory)
+        self.assertEqual(list(memory.view(1, 5)), [200, 100, 300 & 0xFF, 300 & 0xFF])
+        memory = Memory(16, width=16)
+        engine.execute(program, memory)
+        self.assertEqual(list(memory.view(1, 5)), [200, 100, 300, 300])
+
+    def test_default_size(self):
+        self.assertEqual(len(Memory()), engine.MEMORY_SIZE)
+
+    def test_overflow_error(self):
+        memory = Memory(16, width=8, overflow="error")
+        with self.assertRaises(OverflowError):
+            memory[1] = 256
+        memory32 = Memory(16, width=32, overflow="error")
+        with self.assertRaises(OverflowError):
+            memory32[1] = 1 << 32
+        with self.assertRaises(OverflowError):
+            engine.execute(make_program([(0, 1, 255, 0), (0, 2, 1, 0), (2, 3, 1, 2)]), memory)
+
+    def test_snapshot_copy_on_write(self):
+        memory = Memory(8)
+        memory[0] = 1
+        snapshot = memory.snapshot()
+        memory[0] = 2
+        self.assertEqual(snapshot[0], 1)
+        self.assertEqual(memory[0], 2)
+        self.assertEqual(list(memory.view(0, 2)), [2, 0])
+
+class TestJit(unittest.TestCase):
+    def test_matches_engine(self):
+        program = make_program([
+            (0, 1, 5, 0),   # m[1] = 5
+            (0, 2, 7, 0),   # m[2] = 7
+            (2, 3, 1, 2),   # m[3] = m[1] + m[2] — сворачивается в константу
+            (4, 4, 3, 0),   # m[4] += m[3]
+            (0, 5, 1, 0),   # мёртвая запись: m[5] перезаписывается ниже
+            (5, 6, 4, 0),   # m[6] ^= m[4]
+            (1, 5, 6, 0),   # m[5] = m[6]
+        ])
+        initial = [3, 0, 0, 0, 10, 9, 1, 0]
+        expected = list(initial)
+        engine.execute(program, expected)
+        source, stats = jit.generate_source(program)
+        namespace = {}
+        exec(source, namespace)
+        actual = list(initial)
+        namespace["run"](actual)
+        self.assertEqual(actual, expected)
+        self.assertEqual(stats["folded"], 1)
+        self.assertEqual(stats["eliminated"], 1)
+
+    def test_cached_by_hash(self):
+        with open("program.bin", "rb") as f:
+            data = f.read()
+        self.assertIs(jit.compile_binary(data), jit.compile_binary(data))
+
+@unittest.skipIf(numpy is None, "NumPy is not installed")
+class TestBatch(unittest.TestCase):
+    def test_matches_engine_per_image(self):
+        with open("program.bin", "rb") as f:
+            program = engine.decode_program(f.read())
+        images = numpy.arange(3 * 1024, dtype=numpy.uint64).reshape(3, 1024)
+        result = batch.execute_batch(program, images)
+        for i in range(3):
+            memory = Memory(1024)
+            memory.load(int(value) for value in images[i])
+            engine.execute(program, memory)
+            self.assertEqual(list(memory.view()), [int(value) for value in result[i]])
+
+    def test_all_opcodes_all_widths(self):
+        # Поле A перекрывает биты опкода, поэтому в нём повторяется номер опкода
+        source = [
+            "LOAD_CONST 0 1 65535",  # константа шире 8 бит
+            "LOAD_CONST 0 2 300",
+            "LOAD_MEM 1 3 10",
+            "STORE_MEM 2 4 1 2",     # m[4] = m[1] + m[2]
+            "STORE_MEM 2 5 10 11",   # переполнение на любой ширине
+            "BITWISE_OR 3 6 2 12",
+            "ADD 4 7 4",             # m[7] += m[4]
+            "ADD 4 11 11",           # m[11] удваивается
+            "XOR 5 8 3",
+            "XOR 5 12 12",           # обнуление
+        ]
+        program = engine.decode_program(asm.encode_program(source), 16)
+        self.assertEqual(set(program.opcodes), set(range(6)))
+        for width in (8, 16, 64):
+            with self.subTest(width=width):
+                top = (1 << width) - 1
+                images = numpy.array([[(top - 3 * i - cell) * (cell % 3 != 1) for cell in range(16)]
+                                      for i in range(4)], dtype=batch.DTYPES[width])
+                result = batch.execute_batch(program, images, width)
+                for i in range(len(images)):
+                    memory = Memory(16, width=width)
+                    memory.load(int(value) for value in images[i])
+                    engine.execute(program, memory)
+                    self.assertEqual(list(memory.view()), [int(value) for value in result[i]])
+
+class TestContainer(unittest.TestCase):
+    def setUp(self):
+        self.path = "test_program.dz4"
+        with open("program.bin", "rb") as f:
+            self.data = f.read()
+        self.count = len(self.data) // asm.INSTRUCTION_SIZE
+        container.write_container(self.path, self.data, range(10, 10 + self.count))
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_random_access(self):
+        expected = engine.decode_program(self.data)
+        with container.ProgramContainer(self.path) as program:
+            program.verify()
+            self.assertEqual(len(program), self.count)
+            self.assertEqual(sum(program.histogram), self.count)
+            last = program[-1]
+            self.assertEqual((last.opcode, last.b, last.c, last.line),
+                             (expected.opcodes[-1], expected.b[-1], expected.c[-1], 9 + self.count))
+            partial = program.decode(1, 3)
+            self.assertEqual(list(partial.b), list(expected.b[1:3]))
+        self.assertEqual(list(engine.load_program(self.path).c), list(expected.c))
+        self.assertEqual(list(engine.load_program("program.bin", start=1, stop=3).b), list(expected.b[1:3]))
+
+    def test_verify_detects_corruption(self):
+        with open(self.path, "r+b") as f:
+            f.seek(container.HEADER.size + 4)
+            byte = f.read(1)
+            f.seek(-1, os.SEEK_CUR)
+            f.write(bytes([byte[0] ^ 0xFF]))
+        with container.ProgramContainer(self.path) as program:
+            with self.assertRaises(ValueError):
+                program.verify()
+
+    def test_negative_index_out_of_range(self):
+        with container.ProgramContainer(self.path) as program:
+            self.assertEqual(program[-self.count].index, 0)
+            for index in (-self.count - 1, -self.count - 5, self.count):
+                with self.assertRaises(IndexError):
+                    program[index]
+            with self.assertRaises(ValueError):
+                program.decode(0, -2)
+        for path in (self.path, "program.bin"):
+            with self.assertRaises(ValueError):
+                engine.load_program(path, start=-3)
+
+    def test_truncated_container_rejected(self):
+        with open(self.path, "r+b") as f:
+            f.truncate(os.path.getsize(self.path) - 5)
+        with self.assertRaisesRegex(ValueError, "does not match header"):
+            container.ProgramContainer(self.path)
+        with self.assertRaises(ValueError):
+            engine.load_program(self.path, start=8, stop=10)
+
 if __name__ == "__main__":
     unittest.main()
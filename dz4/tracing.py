@@ -0,0 +1,114 @@
+import abc
+import json
+import struct
+from collections import Counter
+
+OPCODE_NAMES = ["LOAD_CONST", "LOAD_MEM", "STORE_MEM", "BITWISE_OR", "ADD", "XOR"]
+# Какие поля каждая команда читает как адреса памяти (для подсчёта горячих адресов)
+READS = {0: (), 1: ("c",), 2: ("c", "d"), 3: ("c", "d"), 4: ("b", "c"), 5: ("b", "c")}
+
+TRACE_LEVELS = ("off", "sampled", "full")
+# Файл трассы по умолчанию для каждого формата
+TRACE_FILES = {"jsonl": "trace.jsonl", "binary": "trace.bin"}
+
+# Запись двоичной трассы: pc, opcode, A, B, C, D, число изменённых ячеек,
+# затем для каждой ячейки адрес и новое значение (младшие 64 бита)
+_RECORD = struct.Struct("<IBBIIIB")
+_CHANGE = struct.Struct("<IQ")
+_MASK64 = (1 << 64) - 1
+
+
+class Tracer(abc.ABC):
+    """Трассировщик выполнения: получает каждую (или каждую N-ю) команду.
+
+    changes — список пар (адрес, новое значение) для изменившихся ячеек.
+    """
+
+    def __init__(self, stream, sample_every=1):
+        if sample_every < 1:
+            raise ValueError(f"sample_every must be at least 1, got {sample_every}")
+        self.stream = stream
+        self.sample_every = sample_every
+
+    def wants(self, pc):
+        return pc % self.sample_every == 0
+
+    @abc.abstractmethod
+    def record(self, pc, opcode, a, b, c, d, changes):
+        """Записывает одну выполненную команду."""
+
+    def close(self):
+        """Закрывает поток трассы."""
+        self.stream.close()
+
+
+class JsonlTracer(Tracer):
+    """Пишет трассу в формате JSON Lines: одна команда — одна строка."""
+
+    def record(self, pc, opcode, a, b, c, d, changes):
+        self.stream.write(json.dumps({"pc": pc, "op": opcode, "a": a, "b": b, "c": c, "d": d,
+                                      "changes": changes}, separators=(",", ":")))
+        self.stream.write("\n")
+
+
+class BinaryTracer(Tracer):
+    """Пишет компактную двоичную трассу (поток открыт в режиме "wb")."""
+
+    def record(self, pc, opcode, a, b, c, d, changes):
+        self.stream.write(_RECORD.pack(pc, opcode, a, b, c, d, len(changes)))
+        for address, value in changes:
+            self.stream.write(_CHANGE.pack(address, value & _MASK64))
+
+
+def read_binary_trace(stream):
+    """Читает двоичную трассу и отдаёт записи в виде словарей."""
+    while header := stream.read(_RECORD.size):
+        pc, opcode, a, b, c, d, count = _RECORD.unpack(header)
+        changes = [_CHANGE.unpack(stream.read(_CHANGE.size)) for _ in range(count)]
+        yield {"pc": pc, "op": opcode, "a": a, "b": b, "c": c, "d": d, "changes": changes}
+
+
+def open_tracer(level, path=None, trace_format="jsonl", sample_every=1000):
+    """Создаёт трассировщик по уровню: off — None, sampled — каждая N-я команда, full — все.
+
+    Без path трасса пишется в файл по умолчанию для формата (TRACE_FILES).
+    """
+    if level not in TRACE_LEVELS:
+        raise ValueError(f"Unknown trace level: {level}")
+    if trace_format not in TRACE_FILES:
+        raise ValueError(f"Unknown trace format: {trace_format}")
+    if level == "off":
+        return None
+    path = path or TRACE_FILES[trace_format]
+    every = sample_every if level == "sampled" else 1
+    if trace_format == "binary":
+        return BinaryTracer(open(path, "wb"), every)
+    return JsonlTracer(open(path, "w"), every)
+
+
+class Profiler:
+    """Считает число и время выполнения команд по опкодам и обращения к адресам."""
+
+    def __init__(self):
+        self.counts = Counter()
+        self.times = Counter()
+        self.addresses = Counter()
+
+    def record(self, opcode, b, c, d, elapsed):
+        self.counts[opcode] += 1
+        self.times[opcode] += elapsed
+        addresses = self.addresses
+        addresses[b] += 1  # Запись результата
+        for field in READS.get(opcode, ()):
+            addresses[b if field == "b" else c if field == "c" else d] += 1
+
+    def summary(self, top=10):
+        opcodes = {}
+        for opcode, count in sorted(self.counts.items()):
+            name = OPCODE_NAMES[opcode] if opcode < len(OPCODE_NAMES) else str(opcode)
+            opcodes[name] = {"count": count, "seconds": self.times[opcode]}
+        return {
+            "opcodes": opcodes,
+            "hot_addresses": [{"address": address, "accesses": count}
+                              for address, count in self.addresses.most_common(top)],
+        }